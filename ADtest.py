@@ -1,12 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
-import soundfile as sf
-import librosa
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
-from scipy import signal
+import resample
+
+# matplotlib / librosa 导入耗时较长，推迟到真正用到时再导入（见 _pyplot 及各方法内部）
 
 # def convert_to_binary_array(frames):
 #     binary_list = []
@@ -69,24 +64,40 @@ from scipy import signal
 
 
 
-plt.rcParams["font.family"] = "SimHei"  # Windows 黑体的 PostScript 名称
-plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
-
 fs = 88200 # 采样频率
 bit_depth = 8  # 量化位深
 frame_size = 128  # 二进制帧大小
 
 
+def _pyplot():
+    """绘图前导入 matplotlib 并设置中文字体"""
+    import matplotlib.pyplot as plt
+    plt.rcParams["font.family"] = "SimHei"  # Windows 黑体的 PostScript 名称
+    plt.rcParams["axes.unicode_minus"] = False  # 解决负号显示问题
+    return plt
+
+
 class SoundOperation(object):
     def __init__(self):
         super.__init__()
 
-    def sound_ADtrans(file_path, duration=1):
-        original_signal, sample_rate, = librosa.load(file_path, sr=None, duration=duration)
-        t_original = np.linspace(0, len(original_signal) / sample_rate, len(original_signal), endpoint=False)
-        # 2. 采样
-        sample_t = np.linspace(0, duration, int(fs*duration), endpoint=False)
-        sampled_signal = np.interp(sample_t, t_original, original_signal)
+    def load_channels(file_path, duration=1):
+        """
+        载入音频文件的全部声道（不混成单声道）
+        :return: (信号 (声道数, 采样数), 采样率)
+        """
+        import librosa
+        original_signal, sample_rate = librosa.load(file_path, sr=None, mono=False, duration=duration)
+        return np.atleast_2d(original_signal), sample_rate
+
+    def ad_convert(original_signal, sample_rate, duration=1, num_frames=10):
+        """
+        对一路已载入的信号做采样、量化与分帧
+        :param num_frames: 取前多少帧，None 表示全部完整帧
+        :return: (sampled_signal, quantized_signal, binary_frames)
+        """
+        # 2. 采样：多相重采样到 fs，取 duration 秒（信号不足时以末尾采样补齐）
+        sampled_signal = resample.fit_length(resample.resample(original_signal, sample_rate, fs), int(fs*duration))
         
         # 假设 sampled_signal 已通过插值得到，范围为 [-0.3, 0.3]
         min_val = np.min(sampled_signal)
@@ -101,18 +112,32 @@ class SoundOperation(object):
         quantized_index = np.round((sampled_signal - min_val) / step)
         quantized_signal = np.clip(quantized_index, 0, levels - 1).astype(int)
         
-        # 4. 转二进制帧
-        frames = quantized_signal[:frame_size * 10].reshape(-1, frame_size)  # 取前10帧
-        binary_frames = np.array([[int(b) for b in f"{num:08b}"] for frame in frames for num in frame])
-        binary_frames = binary_frames.reshape(len(frames), -1)
+        # 4. 转二进制帧（每个量化值8位，高位在前）
+        total = len(quantized_signal) // frame_size if num_frames is None else num_frames
+        frames = quantized_signal[:frame_size * total].reshape(-1, frame_size)  # 默认取前10帧
+        binary_frames = np.unpackbits(frames.astype(np.uint8), axis=1).astype(int)
+        return sampled_signal, quantized_signal, binary_frames
+
+    def sound_ADtrans(file_path, duration=1, plot=True):
+        """plot=False 时不绘图，返回的 fig 为None"""
+        import librosa
+
+        original_signal, sample_rate, = librosa.load(file_path, sr=None, duration=duration)
+        sampled_signal, quantized_signal, binary_frames = \
+            SoundOperation.ad_convert(original_signal, sample_rate, duration)
         
+        if not plot:
+            return None, quantized_signal, binary_frames
+
         # 创建画布和三个子图，共享x轴
+        plt = _pyplot()
         fig, axes = plt.subplots(3, 1, figsize=(10, 8), sharex=True)
         plt.subplots_adjust(hspace=0.4)  # 调整子图间距
         
-        # 计算前3秒的样本数
-        samples_per_second = sample_rate
-        samples_in_3s = int(samples_per_second * 3)
+        # 计算前3秒的样本数，时间轴只为绘制的部分生成
+        samples_in_3s = int(sample_rate * 3)
+        t_original = np.arange(min(len(original_signal), samples_in_3s)) / sample_rate
+        sample_t = np.arange(min(len(sampled_signal), samples_in_3s)) / fs
         
         # 1. 原始信号子图
         axes[0].plot(t_original[:samples_in_3s], original_signal[:samples_in_3s])
@@ -121,19 +146,19 @@ class SoundOperation(object):
         
         # 2. 采样信号子图
         axes[1].plot(t_original[:samples_in_3s], original_signal[:samples_in_3s], '--', alpha=0.5)
-        axes[1].stem(sample_t[:samples_in_3s], sampled_signal[:samples_in_3s], 'r', markerfmt='ro', basefmt=" ")
+        axes[1].stem(sample_t, sampled_signal[:len(sample_t)], 'r', markerfmt='ro', basefmt=" ")
         axes[1].set_title(f'2. 采样信号 (fs={fs}Hz)')
         axes[1].grid(True, linestyle='--', alpha=0.7)
         
         # 3. 量化信号子图
-        axes[2].stem(sample_t[:samples_in_3s], quantized_signal[:samples_in_3s], 'g', markerfmt='go', basefmt=" ")
+        axes[2].stem(sample_t, quantized_signal[:len(sample_t)], 'g', markerfmt='go', basefmt=" ")
         axes[2].set_title(f'3. {bit_depth}位量化信号')
         axes[2].grid(True, linestyle='--', alpha=0.7)
         axes[2].set_xlabel('时间 (秒)')  # 仅为底部子图设置x轴标签
         
         return fig, quantized_signal, binary_frames
     
-    def sound_DAtrans(quantized_signal, sample_rate=44100, bit_depth=8, duration=3):
+    def sound_DAtrans(quantized_signal, sample_rate=44100, bit_depth=8, duration=3, plot=True):
         """
         模拟数字-模拟转换过程
         
@@ -142,6 +167,7 @@ class SoundOperation(object):
             sample_rate: 采样率 (Hz)
             bit_depth: 量化位数
             duration: 信号持续时间 (秒)
+            plot: 是否绘图，False 时返回的 fig 为None
         """
         # 1. 二进制数据转量化值
         # max_level = 2**bit_depth - 1
@@ -160,37 +186,29 @@ class SoundOperation(object):
         # 2. 归一化到[-1, 1]范围
         normalized_signal = 2 * (np.array(numbers) / 255) - 1
         
-        # 3. 创建时间轴
-        t_quantized = np.linspace(0, duration, len(normalized_signal), endpoint=False)
-        
-        # 4. 零阶保持重建 (阶梯状信号)
-        t_reconstructed = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
-        reconstructed_signal = np.zeros_like(t_reconstructed)
-        
-        # 零阶保持插值
-        step = len(t_reconstructed) / len(normalized_signal)
-        for i in range(len(normalized_signal)):
-            start_idx = int(i * step)
-            end_idx = int((i + 1) * step)
-            if end_idx > len(reconstructed_signal):
-                end_idx = len(reconstructed_signal)
-            reconstructed_signal[start_idx:end_idx] = normalized_signal[i]
-        
-        # 5. 低通滤波 (模拟重建滤波器)
-        cutoff_freq = 0.45 * sample_rate  # 截止频率设为采样率的45%
-        nyquist_freq = 0.5 * sample_rate
-        normalized_cutoff = cutoff_freq / nyquist_freq
-        
-        # 设计8阶Butterworth低通滤波器
-        b, a = signal.butter(8, normalized_cutoff, btype='low', analog=False)
-        filtered_signal = signal.filtfilt(b, a, reconstructed_signal)
+        # 3. 重建：量化值均匀分布在 duration 秒内，多相重采样到 sample_rate
+        #    （插值滤波器即重建低通，截止频率为输入奈奎斯特频率的95%）
+        #    输入速率只是把量化值铺满 duration 的名义值，输出还会截齐到 num_samples，
+        #    帧数使比例不可约时允许 1e-3 的相对误差（只影响时间轴的微小伸缩）
+        num_samples = int(sample_rate * duration)
+        filtered_signal = resample.fit_length(
+            resample.resample(normalized_signal, len(normalized_signal) / duration, sample_rate, tolerance=1e-3),
+            num_samples)
+        t_reconstructed = np.arange(num_samples) / sample_rate
         
+        if not plot:
+            return None, filtered_signal, t_reconstructed
+
         # 6. 可视化DA转换过程
+        plt = _pyplot()
         fig, axes = plt.subplots(3, 1, figsize=(10, 10), sharex=True)
         plt.subplots_adjust(hspace=0.4)
 
-        samples_per_second = sample_rate
-        samples_in_3s = int(samples_per_second * 3)
+        samples_in_3s = int(sample_rate * 3)
+        t_quantized = np.arange(len(normalized_signal)) * duration / len(normalized_signal)
+        # 零阶保持（阶梯状信号）仅用于对照显示
+        shown = min(samples_in_3s, num_samples)
+        reconstructed_signal = normalized_signal[np.arange(shown) * len(normalized_signal) // num_samples]
         
         # # 1. 二进制数据
         # axes[0].imshow(binary_frames[:samples_in_3s], aspect='auto', cmap='binary')
@@ -203,12 +221,12 @@ class SoundOperation(object):
         axes[0].grid(True, linestyle='--', alpha=0.7)
         
         # 3. 重建信号 (零阶保持)
-        axes[1].plot(t_reconstructed[:samples_in_3s], reconstructed_signal[:samples_in_3s], 'b-')
+        axes[1].plot(t_reconstructed[:shown], reconstructed_signal, 'b-')
         axes[1].set_title('3. 重建信号 (零阶保持)')
         axes[1].grid(True, linestyle='--', alpha=0.7)
         
         # 4. 滤波后的模拟信号
-        axes[2].plot(t_reconstructed[:samples_in_3s], filtered_signal[:samples_in_3s], 'r-')
+        axes[2].plot(t_reconstructed[:shown], filtered_signal[:shown], 'r-')
         axes[2].set_title('4. 滤波后的模拟信号')
         axes[2].grid(True, linestyle='--', alpha=0.7)
         axes[2].set_xlabel('时间 (秒)')
@@ -0,0 +1,382 @@
+import time
+from typing import List, Optional, Tuple
+
+from protocol import ProtocolHandler, FRAME_DATA, FRAME_ACK, FRAME_NACK, FRAME_SKIP, SEQ_MODULUS
+
+
+def _seq_offset(seq, base):
+    """序号seq相对窗口起点base的偏移量（模SEQ_MODULUS）"""
+    return (seq - base) % SEQ_MODULUS
+
+
+def _u16_bits(value):
+    """16位无符号整数转比特流（MSB优先）"""
+    return [(value >> (15 - i)) & 1 for i in range(16)]
+
+
+def _bits_u16(bits):
+    """比特流转16位无符号整数"""
+    value = 0
+    for bit in bits[:16]:
+        value = (value << 1) | int(bit)
+    return value
+
+
+class RttEstimator:
+    """
+    往返时延估计器（Jacobson/Karels算法 + Karn规则）
+    RTO = SRTT + 4 * RTTVAR，超时后指数退避
+    """
+    def __init__(self, initial_rto=1.0, min_rto=0.05, max_rto=60.0, alpha=0.125, beta=0.25):
+        """
+        :param initial_rto: 尚无RTT样本时的超时时间 (秒)
+        :param min_rto: 超时时间下限 (秒)
+        :param max_rto: 超时时间上限 (秒)
+        :param alpha: SRTT平滑系数
+        :param beta: RTTVAR平滑系数
+        """
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.alpha = alpha
+        self.beta = beta
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial_rto
+
+    def sample(self, rtt):
+        """加入一个RTT样本（仅限未重传过的帧，Karn规则）"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+        self.rto = min(max(self.srtt + 4 * self.rttvar, self.min_rto), self.max_rto)
+
+    def backoff(self):
+        """超时后退避：RTO加倍"""
+        self.rto = min(self.rto * 2, self.max_rto)
+
+
+class SelectiveRepeatSender:
+    """
+    选择重传ARQ发送端
+    与具体传输方式无关：调用方通过 poll() 取出待发送的帧，
+    通过 on_control_frame() 交回接收端返回的ACK/NACK帧。
+    单帧重传达到 max_retries 后放弃：改为发送 SKIP 帧（直到被确认）让接收端越过该序号，
+    放弃的载荷记录在 self.failed 中。
+    所有时间参数均为秒，now 默认取 time.monotonic()，也可由仿真时钟传入。
+    """
+    def __init__(self, protocol: Optional[ProtocolHandler] = None, window_size=64,
+                 initial_rto=1.0, min_rto=0.05, max_rto=60.0, max_retries=None):
+        """
+        :param protocol: 协议处理器(默认新建)
+        :param window_size: 滑动窗口大小(未确认帧的最大数量)
+        :param initial_rto: 初始超时时间 (秒)，GEO链路建议不小于0.6
+        :param min_rto: 超时时间下限 (秒)
+        :param max_rto: 超时时间上限 (秒)
+        :param max_retries: 单帧最大重传次数，None表示不限
+        """
+        if not 0 < window_size <= SEQ_MODULUS // 2:
+            raise ValueError(f"窗口大小必须在1到{SEQ_MODULUS // 2}之间")
+
+        self.protocol = protocol or ProtocolHandler()
+        self.window_size = window_size
+        self.max_retries = max_retries
+        self.rtt = RttEstimator(initial_rto, min_rto, max_rto)
+
+        self.base = 0          # 最早未确认帧序号
+        self.next_seq = 0      # 下一个新帧序号
+        self.pending = []      # 尚未进入窗口的载荷
+        self.outstanding = {}  # 已发送未确认帧 {seq: {...}}
+        self.failed = []       # 放弃发送的 (序号, 载荷)
+        self.stats = {
+            'sent': 0,
+            'retransmitted': 0,
+            'acked': 0,
+            'nacked': 0,
+            'timeouts': 0,
+            'failed': 0,
+        }
+
+    def submit(self, payloads: List[List[int]]):
+        """提交待可靠发送的载荷（比特流列表）"""
+        for payload in payloads:
+            self.pending.append(list(payload))
+
+    @property
+    def in_flight(self):
+        """窗口内已发送未确认的帧数"""
+        return len(self.outstanding)
+
+    @property
+    def done(self):
+        """全部载荷是否均已确认（或放弃）"""
+        return not self.pending and not self.outstanding
+
+    def poll(self, now=None) -> List[List[int]]:
+        """
+        取出当前需要发送的帧
+        先重传超时/被NACK的帧，再在窗口允许范围内发送新帧
+        :return: 帧比特流列表
+        """
+        now = time.monotonic() if now is None else now
+        output = []
+        timed_out = False
+
+        for seq in sorted(self.outstanding, key=lambda s: _seq_offset(s, self.base)):
+            entry = self.outstanding[seq]
+            if not entry['nacked'] and now < entry['deadline']:
+                continue
+            if not entry['nacked']:
+                self.stats['timeouts'] += 1
+                timed_out = True
+            if not entry['skip'] and self.max_retries is not None and entry['retries'] >= self.max_retries:
+                # 放弃该帧：改发 SKIP 帧，接收端确认后窗口才越过该序号
+                self.stats['failed'] += 1
+                self.failed.append((seq, entry['payload']))
+                entry['skip'] = True
+                entry['frame'] = self.protocol.build_seq_frame([], seq, FRAME_SKIP)
+            entry['retries'] += 1
+            entry['nacked'] = False
+            entry['sent_at'] = now
+            entry['deadline'] = now + self.rtt.rto
+            self.stats['retransmitted'] += 1
+            output.append(entry['frame'])
+
+        if timed_out:
+            # 同一轮内多帧超时只退避一次
+            self.rtt.backoff()
+        self._advance_base()
+
+        while self.pending and _seq_offset(self.next_seq, self.base) < self.window_size:
+            seq = self.next_seq
+            payload = self.pending.pop(0)
+            frame = self.protocol.build_seq_frame(payload, seq, FRAME_DATA)
+            self.outstanding[seq] = {
+                'frame': frame,
+                'payload': payload,
+                'skip': False,
+                'sent_at': now,
+                'deadline': now + self.rtt.rto,
+                'retries': 0,
+                'nacked': False,
+            }
+            self.next_seq = (seq + 1) % SEQ_MODULUS
+            self.stats['sent'] += 1
+            output.append(frame)
+
+        return output
+
+    def on_control_frame(self, frame_bits: List[int], now=None) -> bool:
+        """
+        处理接收端返回的ACK/NACK帧
+        ACK帧载荷为接收端的累计确认序号(下一个期望序号)
+        :return: 是否为有效控制帧
+        """
+        now = time.monotonic() if now is None else now
+        frame = self.protocol.parse_seq_frame(frame_bits)
+        if not frame['valid'] or frame['type'] not in (FRAME_ACK, FRAME_NACK):
+            return False
+
+        seq = frame['seq']
+        if frame['type'] == FRAME_ACK:
+            self._ack(seq, now)
+            if frame['payload_bits']:
+                # 累计确认：接收端已按序收齐 cumulative 之前的所有帧
+                cumulative = _bits_u16(frame['payload_bits'])
+                for s in list(self.outstanding):
+                    if 0 < _seq_offset(cumulative, s) <= self.window_size:
+                        self._ack(s, now)
+        else:
+            entry = self.outstanding.get(seq)
+            if entry is not None:
+                entry['nacked'] = True
+                self.stats['nacked'] += 1
+
+        self._advance_base()
+        return True
+
+    def next_timeout(self, now=None) -> Optional[float]:
+        """距最早超时的剩余时间 (秒)，无未确认帧时返回None"""
+        if not self.outstanding:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(e['deadline'] for e in self.outstanding.values()) - now)
+
+    def _ack(self, seq, now):
+        entry = self.outstanding.pop(seq, None)
+        if entry is None or entry['skip']:
+            return
+        if entry['retries'] == 0:
+            # Karn规则：重传过的帧不参与RTT估计
+            self.rtt.sample(now - entry['sent_at'])
+        self.stats['acked'] += 1
+
+    def _advance_base(self):
+        while self.base != self.next_seq and self.base not in self.outstanding:
+            self.base = (self.base + 1) % SEQ_MODULUS
+
+
+class SelectiveRepeatReceiver:
+    """
+    选择重传ARQ接收端
+    根据CRC结果回复ACK/NACK，缓存乱序帧并按序交付；
+    收到 SKIP 帧时越过对应序号（该载荷不交付）
+    """
+    def __init__(self, protocol: Optional[ProtocolHandler] = None, window_size=64):
+        """
+        :param protocol: 协议处理器(默认新建)
+        :param window_size: 接收窗口大小(应与发送端一致)
+        """
+        self.protocol = protocol or ProtocolHandler()
+        self.window_size = window_size
+        self.base = 0       # 下一个期望按序交付的序号
+        self.buffer = {}    # 窗口内乱序到达的帧 {seq: payload_bits}
+        self.nacked = set() # 已发送NACK、尚未收到的序号，避免重复NACK
+        self.stats = {
+            'received': 0,
+            'delivered': 0,
+            'duplicates': 0,
+            'crc_errors': 0,
+            'skipped': 0,
+        }
+
+    def on_frame(self, frame_bits: List[int]) -> Tuple[List[List[int]], List[List[int]]]:
+        """
+        处理一个收到的数据帧
+        :return: (按序交付的载荷列表, 需回送给发送端的控制帧列表)
+        """
+        frame = self.protocol.parse_seq_frame(frame_bits)
+        delivered = []
+        control = []
+
+        if frame['type'] not in (None, FRAME_DATA, FRAME_SKIP):
+            return delivered, control
+
+        seq = frame['seq']
+        if frame['valid'] and frame['type'] == FRAME_SKIP:
+            return self._on_skip(seq)
+        if not frame['valid']:
+            self.stats['crc_errors'] += 1
+            # 帧头中的序号仍可读且落在窗口内时，请求立即重传
+            if seq is not None and _seq_offset(seq, self.base) < self.window_size:
+                control.append(self._nack(seq))
+            return delivered, control
+
+        self.stats['received'] += 1
+        offset = _seq_offset(seq, self.base)
+
+        if offset >= self.window_size:
+            # 窗口之前的帧：ACK已丢失导致的重复帧，重新确认
+            self.stats['duplicates'] += 1
+            control.append(self._ack(seq))
+            return delivered, control
+
+        if seq in self.buffer:
+            self.stats['duplicates'] += 1
+        else:
+            self.buffer[seq] = frame['payload_bits']
+        self.nacked.discard(seq)
+
+        # 窗口内出现空洞：对缺失的帧发送NACK
+        for i in range(offset):
+            missing = (self.base + i) % SEQ_MODULUS
+            if missing not in self.buffer and missing not in self.nacked:
+                control.append(self._nack(missing))
+                self.nacked.add(missing)
+
+        delivered = self._deliver()
+        control.append(self._ack(seq))
+        return delivered, control
+
+    def _on_skip(self, seq):
+        """发送端已放弃 seq：在窗口内时占位（不交付），随后按序交付其后的帧"""
+        if _seq_offset(seq, self.base) < self.window_size and seq not in self.buffer:
+            self.buffer[seq] = None
+            self.stats['skipped'] += 1
+        self.nacked.discard(seq)
+        return self._deliver(), [self._ack(seq)]
+
+    def _deliver(self):
+        delivered = []
+        while self.base in self.buffer:
+            payload = self.buffer.pop(self.base)
+            if payload is not None:
+                delivered.append(payload)
+            self.base = (self.base + 1) % SEQ_MODULUS
+        self.stats['delivered'] += len(delivered)
+        return delivered
+
+    def _ack(self, seq):
+        return self.protocol.build_seq_frame(_u16_bits(self.base), seq, FRAME_ACK)
+
+    def _nack(self, seq):
+        return self.protocol.build_seq_frame([], seq, FRAME_NACK)
+
+
+def _simulate(sender, receiver, payloads, one_way, loss, blackhole=()):
+    """
+    离散事件仿真：数据帧与控制帧各自以 loss 的概率丢失，序号在 blackhole 中的数据帧一律丢失
+    :return: (接收端按序交付的载荷, 仿真结束时刻)
+    """
+    import heapq
+    import random
+
+    sender.submit(payloads)
+    events = []  # (到达时间, 序号, 方向, 帧)
+    counter = 0
+    now = 0.0
+    received = []
+
+    while not sender.done:
+        for frame in sender.poll(now):
+            parsed = sender.protocol.parse_seq_frame(frame)
+            dropped = parsed['type'] == FRAME_DATA and parsed['seq'] in blackhole
+            if not dropped and random.random() >= loss:
+                heapq.heappush(events, (now + one_way, counter, 'data', frame))
+            counter += 1
+
+        timeout = sender.next_timeout(now)
+        next_event = events[0][0] if events else None
+        candidates = [t for t in (next_event, None if timeout is None else now + timeout) if t is not None]
+        if not candidates:
+            break
+        now = min(candidates)
+
+        while events and events[0][0] <= now:
+            _, _, direction, frame = heapq.heappop(events)
+            if direction == 'data':
+                delivered, control = receiver.on_frame(frame)
+                received.extend(delivered)
+                for ctrl in control:
+                    if random.random() >= loss:
+                        heapq.heappush(events, (now + one_way, counter, 'ctrl', ctrl))
+                    counter += 1
+            else:
+                sender.on_control_frame(frame, now)
+    return received, now
+
+
+# 使用示例：在单向时延约240ms、丢包率10%的GEO链路上传输
+if __name__ == "__main__":
+    import random
+
+    random.seed(0)
+    payloads = [[(i >> (7 - b)) & 1 for b in range(8)] * 4 for i in range(200)]
+
+    sender = SelectiveRepeatSender(window_size=32, initial_rto=1.0)
+    receiver = SelectiveRepeatReceiver(window_size=32)
+    received, now = _simulate(sender, receiver, payloads, one_way=0.24, loss=0.1)
+    print(f"发送端统计: {sender.stats}")
+    print(f"接收端统计: {receiver.stats}")
+    print(f"仿真耗时: {now:.2f} s, SRTT: {sender.rtt.srtt:.3f} s")
+    print("数据是否一致:", received == payloads)
+
+    # 序号17的数据帧永久丢失：发送端重传 max_retries 次后放弃并发送 SKIP，其后的帧仍应按序交付
+    sender = SelectiveRepeatSender(window_size=32, initial_rto=1.0, max_retries=3)
+    receiver = SelectiveRepeatReceiver(window_size=32)
+    received, now = _simulate(sender, receiver, payloads, one_way=0.24, loss=0.1, blackhole={17})
+    expected = payloads[:17] + payloads[18:]
+    print(f"\n永久丢失序号17: 发送端放弃 {[seq for seq, _ in sender.failed]}, 接收端统计: {receiver.stats}")
+    print("其余数据是否按序交付:", received == expected)
@@ -0,0 +1,186 @@
+"""
+批量发送处理
+输入一个目录或清单文件中的多个音频文件，多声道文件的每个声道作为独立的逻辑流，
+在进程池中并行执行 AD → 信道编码 → 组帧 → 调制，每个流输出一个采集文件（格式见 capture.py），
+最后汇总进度与吞吐量到 summary.json
+    python batch_tx.py recordings/ -o out/ -j 8
+    python batch_tx.py manifest.txt -o out/ --codec conv
+清单文件每行一个音频路径（相对清单所在目录），# 开头为注释
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.mp3', '.ogg', '.aiff', '.aif')
+SUMMARY_FILE = 'summary.json'
+
+# 工作进程内复用的编解码器/调制器/协议处理器，由 _init_worker 创建
+_worker = {}
+
+
+def discover(source, recursive=False):
+    """
+    :param source: 目录或清单文件
+    :return: [(音频路径, 相对名称)]，相对名称（保留扩展名，a.wav 与 a.flac 不会重名）用于生成输出文件名
+    :raises ValueError: 不同路径映射到同一个名称（如清单重复列出同一文件），输出会互相覆盖
+    """
+    if os.path.isdir(source):
+        paths = []
+        if recursive:
+            for root, _, files in os.walk(source):
+                paths += [os.path.join(root, f) for f in files]
+        else:
+            paths = [os.path.join(source, f) for f in os.listdir(source)]
+        paths = sorted(p for p in paths if p.lower().endswith(AUDIO_EXTENSIONS) and os.path.isfile(p))
+        base = source
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding='utf-8') as f:
+            lines = [line.strip() for line in f]
+        paths = [p if os.path.isabs(p) else os.path.join(base, p)
+                 for p in lines if p and not p.startswith('#')]
+
+    files, seen = [], {}
+    for path in paths:
+        name = os.path.relpath(path, base).replace(os.sep, '__').replace('..', '_')
+        if name in seen:
+            raise ValueError(f"输出名称冲突: {seen[name]} 与 {path} 都会写入 {name}_ch*.pscap")
+        seen[name] = path
+        files.append((path, name))
+    return files
+
+
+def _init_worker(codec, bit_duration, num_frames, duration):
+    import moderate_test, fec, protocol
+    _worker['codec'] = fec.create(codec)
+    _worker['modem'] = moderate_test.AmplitudeModem(bit_duration=bit_duration)
+    _worker['protocol'] = protocol.ProtocolHandler()
+    _worker['num_frames'] = num_frames
+    _worker['duration'] = duration
+
+
+def process_file(path, name, out_dir):
+    """
+    在工作进程中处理一个文件的全部声道
+    调制信号逐帧写入采集文件 <名称>_ch<声道>.pscap，不在内存中保留整批信号
+    :return: 每个声道的记录列表
+    """
+    import ADtest, capture
+    codec, modem, _protocol = _worker['codec'], _worker['modem'], _worker['protocol']
+
+    start = time.perf_counter()
+    channels, sample_rate = ADtest.SoundOperation.load_channels(path, _worker['duration'])
+    records = []
+    for channel, original_signal in enumerate(channels):
+        _, _, frames = ADtest.SoundOperation.ad_convert(
+            original_signal, sample_rate, _worker['duration'], _worker['num_frames'])
+        send_p = _protocol.build_frames(codec.encode(frames))
+
+        artifact = capture.write_frames(os.path.join(out_dir, f"{name}_ch{channel}.pscap"), modem, send_p)
+
+        records.append({
+            'file': path,
+            'channel': channel,
+            'channels': len(channels),
+            'sample_rate': int(sample_rate),
+            'artifact': artifact,
+            'frames': len(frames),
+            'source_bits': int(np.size(frames)),
+            'channel_bits': int(sum(len(row) for row in send_p)),
+            'samples': int(sum(len(row) for row in send_p) * modem.samples_per_bit),
+        })
+    elapsed = time.perf_counter() - start
+    for record in records:
+        record['seconds'] = elapsed / len(records)
+    return records
+
+
+def run(files, out_dir, workers=None, codec='turbo', bit_duration=0.1, num_frames=10, duration=1.0,
+        verbose=True):
+    """
+    :param files: discover() 的结果
+    :param workers: 进程数，默认 CPU 核数
+    :return: 汇总字典（同时写入 out_dir/summary.json）
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    streams, failures = [], []
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(codec, bit_duration, num_frames, duration)) as pool:
+        futures = {pool.submit(process_file, path, name, out_dir): path for path, name in files}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                records = future.result()
+            except Exception as e:
+                failures.append({'file': path, 'error': f"{type(e).__name__}: {e}"})
+                if verbose:
+                    print(f"[{done}/{len(files)}] {path} 失败: {e}")
+                continue
+            streams.extend(records)
+            if verbose:
+                bits = sum(r['source_bits'] for r in records)
+                print(f"[{done}/{len(files)}] {path}: {len(records)} 路, {bits} 信源比特, "
+                      f"{sum(r['seconds'] for r in records):.2f} s")
+
+    wall = time.perf_counter() - start
+    source_bits = sum(r['source_bits'] for r in streams)
+    summary = {
+        'files': len(files),
+        'failed': len(failures),
+        'streams': len(streams),
+        'codec': codec,
+        'wall_seconds': wall,
+        'cpu_seconds': sum(r['seconds'] for r in streams),
+        'source_bits': source_bits,
+        'channel_bits': sum(r['channel_bits'] for r in streams),
+        'files_per_second': (len(files) - len(failures)) / wall if wall else 0.0,
+        'source_bits_per_second': source_bits / wall if wall else 0.0,
+        'stream_records': streams,
+        'failures': failures,
+    }
+    with open(os.path.join(out_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="批量发送处理")
+    parser.add_argument('source', help="音频目录或清单文件")
+    parser.add_argument('-o', '--out', default='batch_out', help="输出目录")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument('-r', '--recursive', action='store_true', help="递归搜索子目录")
+    parser.add_argument('--codec', default='turbo', help="fec 编解码器名称")
+    parser.add_argument('--bit-duration', type=float, default=0.1, help="调制每比特时长 (秒)")
+    parser.add_argument('--frames', type=int, default=10, help="每路取前多少帧，0 表示全部")
+    parser.add_argument('--duration', type=float, default=1.0, help="每个文件读取的时长 (秒)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        files = discover(args.source, args.recursive)
+    except ValueError as e:
+        print(e)
+        return 1
+    if not files:
+        print(f"未找到音频文件: {args.source}")
+        return 1
+    print(f"共 {len(files)} 个文件，输出到 {args.out}")
+    summary = run(files, args.out, args.workers, args.codec, args.bit_duration,
+                  args.frames or None, args.duration)
+    print(f"完成 {summary['files'] - summary['failed']}/{summary['files']} 个文件, {summary['streams']} 路, "
+          f"耗时 {summary['wall_seconds']:.2f} s, {summary['files_per_second']:.2f} 文件/s, "
+          f"{summary['source_bits_per_second']:.0f} 信源bit/s")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+全链路基准测试
+覆盖组帧/解帧、Turbo与卷积码编解码、幅度调制解调、重采样、AD/DA以及完整流水线，
+按帧长和批量大小组合测量 ops/s、bits/s 与峰值内存，可保存 JSON 基线并与基线比较找出性能回退
+只依赖本仓库自带的 BAK.wav 和合成数据，单核离线即可运行
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import moderate_test, coding_test, fec, protocol, resample, kernels
+
+AUDIO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BAK.wav')
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+FRAME_SIZES = (128, 1024)
+BATCH_SIZES = (1, 4)
+# 调制解调按每比特 44 个采样测试（默认参数每比特 4410 个采样，单帧即上千万个浮点数），
+# 采样数与 bits/s 成反比，可直接换算
+MODEM_BIT_DURATION = 0.001
+
+
+class Case:
+    """
+    一个基准用例
+    setup() 返回传给 run 的参数（不计时），run(*args) 为被测操作，bits 为每次操作处理的比特数
+    """
+    def __init__(self, name, setup, run, bits, frame_bits=None, batch=None, skip=None):
+        self.name = name
+        self.skip = skip  # 非空时为跳过原因
+        self.setup = setup
+        self.run = run
+        self.bits = bits
+        self.frame_bits = frame_bits
+        self.batch = batch
+
+    @property
+    def key(self):
+        if self.frame_bits is None:
+            return self.name
+        return f"{self.name}[frame={self.frame_bits},batch={self.batch}]"
+
+
+def _random_frames(frame_bits, batch, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 2, frame_bits) for _ in range(batch)]
+
+
+def _frame_bits_total(frames):
+    return sum(len(f) for f in frames)
+
+
+def build_cases(frame_sizes=FRAME_SIZES, batch_sizes=BATCH_SIZES):
+    cases = []
+    proto = protocol.ProtocolHandler()
+    modem = moderate_test.AmplitudeModem(bit_duration=MODEM_BIT_DURATION)
+
+    for frame_bits in frame_sizes:
+        turbo = coding_test.TurboEncoderDecoder(frame_len=frame_bits, interleaver_size=frame_bits)
+        conv = fec.create('conv', frame_len=frame_bits)
+        for batch in batch_sizes:
+            payloads = [list(f) for f in _random_frames(frame_bits, batch)]
+            frames = proto.build_frames(payloads)
+            encoded = turbo.encode(_random_frames(frame_bits, batch))
+            conv_encoded = conv.encode(_random_frames(frame_bits, batch))
+            modulated = modem.modulate(frames)
+            bits = frame_bits * batch
+            common = dict(frame_bits=frame_bits, batch=batch)
+
+            cases += [
+                Case('protocol.build_frames', lambda p=payloads: (p,), proto.build_frames, bits, **common),
+                Case('protocol.parse_frames', lambda f=frames: (f,), proto.parse_frames, bits, **common),
+                Case('turbo.encode', lambda b=frame_bits, n=batch: (_random_frames(b, n),),
+                     turbo.encode, bits, **common),
+                Case('turbo.decode', lambda e=encoded: (e,), turbo.decode, bits, **common),
+                Case('conv.encode', lambda b=frame_bits, n=batch: (_random_frames(b, n),),
+                     conv.encode, bits, **common),
+                Case('conv.decode', lambda e=conv_encoded: (e,), conv.decode, bits, **common),
+                Case('modem.modulate', lambda f=frames: (f,), modem.modulate,
+                     _frame_bits_total(frames), **common),
+                Case('modem.demodulate', lambda m=modulated: (m,), modem.demodulate,
+                     _frame_bits_total(frames), **common),
+                Case('pipeline.synthetic', lambda b=frame_bits, n=batch: (_random_frames(b, n),),
+                     lambda data, t=turbo: _run_pipeline(data, t, proto, modem), bits, **common),
+            ]
+
+    # 多相重采样：AD 方向 1 秒 44.1kHz → 88.2kHz，DA 方向 10 帧量化值（3 秒）→ 44.1kHz；比特数按8位采样计
+    audio = np.sin(2 * np.pi * 440 * np.arange(44100) / 44100)
+    levels = np.random.default_rng(0).uniform(-1, 1, 10 * 128)
+    cases += [
+        Case('resample.ad', lambda: (audio, 44100, 88200), resample.resample, 88200 * 8),
+        Case('resample.da', lambda: (levels, len(levels) / 3, 44100), resample.resample, len(levels) * 8),
+    ]
+
+    cases += _audio_cases(proto, modem)
+    return cases
+
+
+def _run_pipeline(frames, turbo, proto, modem):
+    """编码 → 组帧 → 调制 → 解调 → 解帧 → 解码"""
+    signal = modem.modulate(proto.build_frames(turbo.encode(frames)))
+    return turbo.decode(proto.parse_frames(modem.demodulate(signal)))
+
+
+def _audio_cases(proto, modem):
+    """AD/DA 及含 AD/DA 的完整流水线；缺少音频依赖时返回跳过标记"""
+    try:
+        import ADtest
+        import matplotlib.pyplot as plt
+    except ImportError as e:
+        return [Case(name, None, None, 0, skip=str(e))
+                for name in ('ADtest.sound_ADtrans', 'ADtest.sound_DAtrans', 'pipeline.audio')]
+
+    def ad():
+        fig, quantized, frames = ADtest.SoundOperation.sound_ADtrans(AUDIO_FILE)
+        plt.close(fig)
+        return frames
+
+    def da(bits):
+        fig, filtered, _ = ADtest.SoundOperation.sound_DAtrans(bits)
+        plt.close(fig)
+        return filtered
+
+    turbo = coding_test.TurboEncoderDecoder()
+    da_bits = _random_frames(1024, 10)
+
+    def full():
+        return da(_run_pipeline(ad(), turbo, proto, modem))
+
+    return [
+        Case('ADtest.sound_ADtrans', lambda: (), ad, 10 * 1024),
+        Case('ADtest.sound_DAtrans', lambda: (da_bits,), da, 10 * 1024),
+        Case('pipeline.audio', lambda: (), full, 10 * 1024),
+    ]
+
+
+def measure(case, min_time=0.5, max_repeats=1000):
+    """
+    计时：重复执行直到累计 min_time 秒，取每次耗时的中位数；
+    峰值内存在单独一次带 tracemalloc 的运行中测量，避免干扰计时
+    """
+    if case.skip:
+        return {'skipped': case.skip}
+
+    times = []
+    total = 0.0
+    while total < min_time and len(times) < max_repeats:
+        args = case.setup()
+        start = time.perf_counter()
+        case.run(*args)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+
+    args = case.setup()
+    tracemalloc.start()
+    case.run(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = float(np.median(times))
+    return {
+        'repeats': len(times),
+        'median_s': median,
+        'ops_per_s': 1 / median,
+        'bits_per_s': case.bits / median,
+        'peak_mem_bytes': peak,
+        'frame_bits': case.frame_bits,
+        'batch': case.batch,
+    }
+
+
+def run(cases, min_time=0.5, pattern=None, verbose=True):
+    results = {}
+    for case in cases:
+        if pattern and pattern not in case.key:
+            continue
+        result = measure(case, min_time)
+        results[case.key] = result
+        if verbose:
+            if result.get('skipped'):
+                print(f"{case.key:<55} 跳过: {result['skipped']}")
+            else:
+                print(f"{case.key:<55} {result['ops_per_s']:>10.2f} ops/s "
+                      f"{result['bits_per_s']:>14.0f} bit/s {result['peak_mem_bytes'] / 1e6:>9.2f} MB")
+    return results
+
+
+def environment():
+    return {
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'kernels': kernels.backend(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, ensure_ascii=False)
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    与基线比较
+    :param threshold: ops/s 下降超过该比例，或峰值内存增长超过该比例即视为回退
+    :return: 回退列表 [(用例, 指标, 基线值, 当前值)]
+    """
+    regressions = []
+    for key, current in results.items():
+        old = baseline.get('results', {}).get(key)
+        if not old or current.get('skipped') or old.get('skipped'):
+            continue
+        if current['ops_per_s'] < old['ops_per_s'] * (1 - threshold):
+            regressions.append((key, 'ops_per_s', old['ops_per_s'], current['ops_per_s']))
+        if current['peak_mem_bytes'] > old['peak_mem_bytes'] * (1 + threshold):
+            regressions.append((key, 'peak_mem_bytes', old['peak_mem_bytes'], current['peak_mem_bytes']))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="全链路基准测试")
+    parser.add_argument('--frame-sizes', type=int, nargs='+', default=list(FRAME_SIZES), help="帧长 (比特)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=list(BATCH_SIZES), help="每批帧数")
+    parser.add_argument('--min-time', type=float, default=0.5, help="每个用例的最短累计计时 (秒)")
+    parser.add_argument('-k', dest='pattern', default=None, help="只运行名称包含该字符串的用例")
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, default=None, help="保存为基线 JSON")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, default=None, help="与基线 JSON 比较")
+    parser.add_argument('--threshold', type=float, default=0.2, help="回退判定阈值（比例）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = run(build_cases(args.frame_sizes, args.batch_sizes), args.min_time, args.pattern)
+
+    if args.save:
+        save_baseline(results, args.save)
+        print(f"基线已保存: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for key, metric, old, new in regressions:
+            print(f"回退: {key} {metric} {old:.4g} → {new:.4g}")
+        if regressions:
+            return 1
+        print("与基线相比无回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
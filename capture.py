@@ -0,0 +1,193 @@
+"""
+调制信号采集文件（捕获/回放）
+文件格式（小端序）：
+    [文件头 48B，补零到 64B | float32 采样 × N | 帧起点索引 uint64 × 帧数]
+    文件头：魔数'PSCP'(4B) | 版本(2B) | 数据类型(2B) | 采样率(8B) | 载波频率(8B)
+            | 每比特采样数(4B) | 帧数(4B) | 采样数(8B) | 索引偏移(8B)
+采样紧跟在固定长度的文件头之后，可直接用 np.memmap 映射；帧索引写在末尾，
+因此写入端可以边调制边写，关闭时再回填文件头
+"""
+import os
+import struct
+import time
+import numpy as np
+
+MAGIC = b'PSCP'
+VERSION = 1
+HEADER = struct.Struct('<4sHHddIIQQ')
+DATA_OFFSET = 64
+DTYPE_FLOAT32 = 1   # 与 wire.DTYPES 编号一致
+SAMPLE_DTYPE = np.dtype('<f4')
+
+
+class CaptureWriter:
+    """
+    流式写入采集文件
+        with CaptureWriter(path, modem.sample_rate, modem.carrier_freq, modem.samples_per_bit) as w:
+            for row in frames:
+                w.write_frame(modem.modulate([row])[0])
+    """
+    def __init__(self, path, sample_rate, carrier_hz=0.0, samples_per_bit=0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.carrier_hz = carrier_hz
+        self.samples_per_bit = samples_per_bit
+        self.frames = []
+        self.num_samples = 0
+        self.file = open(path, 'wb')
+        self._write_header(index_offset=0)
+
+    @classmethod
+    def for_modem(cls, path, modem):
+        """按调制器参数创建"""
+        return cls(path, modem.sample_rate, modem.carrier_freq, modem.samples_per_bit)
+
+    def _write_header(self, index_offset):
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, DTYPE_FLOAT32, self.sample_rate, self.carrier_hz,
+                                    self.samples_per_bit, len(self.frames), self.num_samples, index_offset))
+        self.file.write(bytes(DATA_OFFSET - HEADER.size))
+
+    def write(self, samples):
+        """追加采样（不开始新帧）"""
+        arr = np.ascontiguousarray(samples, dtype=SAMPLE_DTYPE).ravel()
+        self.file.write(memoryview(arr).cast('B'))
+        self.num_samples += arr.size
+
+    def mark_frame(self):
+        """记录当前位置为一帧的起点"""
+        self.frames.append(self.num_samples)
+
+    def write_frame(self, samples):
+        self.mark_frame()
+        self.write(samples)
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = DATA_OFFSET + self.num_samples * SAMPLE_DTYPE.itemsize
+        self.file.seek(index_offset)
+        self.file.write(np.asarray(self.frames, dtype='<u8').tobytes())
+        self._write_header(index_offset)
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Capture:
+    """
+    以内存映射方式打开采集文件，采样不读入内存
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            fixed = f.read(HEADER.size)
+            if len(fixed) < HEADER.size:
+                raise ValueError("采集文件不完整")
+            (magic, version, dtype_code, self.sample_rate, self.carrier_hz, self.samples_per_bit,
+             num_frames, self.num_samples, index_offset) = HEADER.unpack(fixed)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("不是采集文件或版本不匹配")
+            if dtype_code != DTYPE_FLOAT32:
+                raise ValueError(f"未知数据类型编号: {dtype_code}")
+            if index_offset == 0:
+                raise ValueError("采集文件未正常关闭（缺少帧索引）")
+            f.seek(index_offset)
+            self.frame_starts = np.frombuffer(f.read(num_frames * 8), dtype='<u8').astype(np.int64)
+
+        self.samples = np.memmap(path, dtype=SAMPLE_DTYPE, mode='r', offset=DATA_OFFSET,
+                                 shape=(self.num_samples,)) if self.num_samples else np.zeros(0, SAMPLE_DTYPE)
+
+    @property
+    def num_frames(self):
+        return len(self.frame_starts)
+
+    @property
+    def duration(self):
+        """信号时长 (秒)"""
+        return self.num_samples / self.sample_rate
+
+    def frame(self, i) -> np.ndarray:
+        """第 i 帧的采样（内存映射视图）"""
+        end = self.frame_starts[i + 1] if i + 1 < self.num_frames else self.num_samples
+        return self.samples[self.frame_starts[i]:end]
+
+    def chunks(self, chunk_samples=1 << 18):
+        """按块产出采样视图"""
+        for start in range(0, self.num_samples, chunk_samples):
+            yield self.samples[start:start + chunk_samples]
+
+    def replay(self, consumer, chunk_samples=1 << 18, realtime=False, speed=1.0, repeat=1):
+        """
+        回放：把采样按块交给 consumer(chunk)
+        :param realtime: True 时按采样率节拍送出（speed 为倍速），否则尽快送出
+        :param repeat: 重复回放次数
+        :return: {'samples', 'seconds', 'speedup'}，speedup 为相对实时的倍数
+        """
+        start = time.perf_counter()
+        sent = 0
+        for _ in range(repeat):
+            for chunk in self.chunks(chunk_samples):
+                if realtime:
+                    delay = start + sent / (self.sample_rate * speed) - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                consumer(chunk)
+                sent += len(chunk)
+        elapsed = time.perf_counter() - start
+        return {'samples': sent, 'seconds': elapsed,
+                'speedup': sent / self.sample_rate / elapsed if elapsed else float('inf')}
+
+    def send(self, sock, receiver_host, receiver_port, repeat=1, **kwargs):
+        """
+        作为 wire 消息经套接字回放（可发往中继或直接发往接收端），每次重复为一条消息；
+        数据直接从映射区按块发送，支持与 replay 相同的节拍参数
+        """
+        import wire
+        total = {'samples': 0, 'seconds': 0.0}
+        for _ in range(repeat):
+            sock.sendall(wire.pack_header(receiver_host, receiver_port, self.samples))
+            stats = self.replay(lambda chunk: sock.sendall(memoryview(chunk).cast('B')), **kwargs)
+            total['samples'] += stats['samples']
+            total['seconds'] += stats['seconds']
+        total['speedup'] = (total['samples'] / self.sample_rate / total['seconds']
+                            if total['seconds'] else float('inf'))
+        return total
+
+
+def write_frames(path, modem, frames):
+    """逐帧调制并写入采集文件，任何时刻只有一帧的调制信号在内存中"""
+    with CaptureWriter.for_modem(path, modem) as writer:
+        for row in frames:
+            writer.write_frame(modem.modulate([row])[0])
+    return path
+
+
+# 使用示例
+if __name__ == "__main__":
+    import tempfile
+    import moderate_test, fec, protocol, rx_pipeline
+
+    modem = moderate_test.AmplitudeModem(bit_duration=0.001)
+    codec = fec.create('turbo', frame_len=128)
+    _protocol = protocol.ProtocolHandler()
+    frames = [np.unpackbits(row) for row in np.random.default_rng(0).integers(0, 256, (20, 16), dtype=np.uint8)]
+
+    path = os.path.join(tempfile.gettempdir(), 'demo.pscap')
+    write_frames(path, modem, _protocol.build_frames(codec.encode(frames)))
+
+    capture = Capture(path)
+    print(f"{path}: {capture.num_frames} 帧, {capture.num_samples} 采样, {capture.duration:.2f} s, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+    for realtime in (False, True):
+        pipeline = rx_pipeline.ReceiverPipeline(codec, modem, _protocol)
+        blocks = []
+        stats = capture.replay(lambda chunk: blocks.extend(pipeline.feed(chunk)),
+                               chunk_samples=4096, realtime=realtime, speed=4.0)
+        print(f"{'节拍(4倍速)' if realtime else '全速'}回放: {len(blocks)} 个音频块, "
+              f"{stats['seconds']:.2f} s, 实时倍数 {stats['speedup']:.1f}x, {pipeline.stats}")
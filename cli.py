@@ -0,0 +1,163 @@
+"""
+统一命令行入口
+    python cli.py tx    [-i 音频文件] [--relay HOST:PORT] [--to HOST:PORT] [--capture 采集文件]
+    python cli.py replay 采集文件 [--relay HOST:PORT | --local] [--to HOST:PORT] [--realtime] [--repeat N]
+    python cli.py batch 目录或清单 [批量参数，见 batch_tx.py --help]
+    python cli.py rx    [--host HOST] [--port PORT]
+    python cli.py relay [中继参数，见 relay.py --help]
+    python cli.py sim   [--messages N] [--interval MS] [--orbit-height KM] [--seed S]
+    python cli.py bench [基准参数，见 benchmark.py --help]
+    python cli.py --kernels numba <子命令> ...   # 选择计算核后端（默认 auto）
+各子命令只在执行时导入对应模块，启动时不加载 matplotlib/librosa/scipy
+"""
+import argparse
+import sys
+import time
+
+
+def _address(text):
+    """解析 HOST:PORT"""
+    host, _, port = text.rpartition(':')
+    if not host:
+        raise argparse.ArgumentTypeError(f"地址格式应为 HOST:PORT: {text}")
+    return host, int(port)
+
+
+def cmd_tx(args, rest):
+    import sender
+    file_path = args.input or sender.data_proccess.AUDIO_FILE
+    if args.capture:
+        sender.data_proccess.capture_data_proccess(args.capture, file_path)
+    else:
+        sender.send(file_path, args.relay, args.to)
+    return 0
+
+
+def cmd_replay(args, rest):
+    import capture
+    cap = capture.Capture(args.capture)
+    print(f"{args.capture}: {cap.num_frames} 帧, {cap.num_samples} 采样, {cap.duration:.2f} s")
+    options = dict(chunk_samples=args.chunk, realtime=args.realtime, speed=args.speed, repeat=args.repeat)
+
+    if args.local:
+        # 在本进程内按采集文件记录的调制参数送入接收流水线
+        import moderate_test, rx_pipeline
+        modem = moderate_test.AmplitudeModem(carrier_freq=cap.carrier_hz, sample_rate=int(round(cap.sample_rate)),
+                                             samples_per_bit=cap.samples_per_bit)
+        if modem.samples_per_bit != cap.samples_per_bit:
+            raise SystemExit(f"无法按采集文件重建调制器: 采集文件每比特 {cap.samples_per_bit} 采样，"
+                             f"调制器为 {modem.samples_per_bit} 采样")
+        pipeline = rx_pipeline.ReceiverPipeline(args.codec, modem)
+        blocks = []
+        stats = cap.replay(lambda chunk: blocks.extend(pipeline.feed(chunk)), **options)
+        print(f"音频块: {len(blocks)}, {pipeline.stats}")
+    else:
+        import socket
+        with socket.create_connection(args.relay or args.to) as sock:
+            stats = cap.send(sock, args.to[0], args.to[1], **options)
+    print(f"回放 {stats['samples']} 采样, {stats['seconds']:.2f} s, 实时倍数 {stats['speedup']:.1f}x")
+    return 0
+
+
+def cmd_batch(args, rest):
+    import batch_tx
+    return batch_tx.main(rest)
+
+
+def cmd_rx(args, rest):
+    import asyncio
+    import receiver
+    try:
+        asyncio.run(receiver.main(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_relay(args, rest):
+    import relay
+    relay.run(relay.build_parser().parse_args(rest))
+    return 0
+
+
+def cmd_sim(args, rest):
+    import satellite_communication
+    wall_start = time.time()
+    stats, delays, end = satellite_communication.simulate(
+        args.messages, args.interval, args.orbit_height, args.seed)
+    print(f"仿真 {len(delays)} 条消息，虚拟时长 {end:.1f} ms，实际耗时 {(time.time() - wall_start) * 1000:.1f} ms")
+    if delays:
+        print(f"平均传输时间 {sum(delays) / len(delays):.2f} ms，卫星统计: {stats}")
+    return 0
+
+
+def cmd_bench(args, rest):
+    import benchmark
+    return benchmark.main(rest)
+
+
+# 参数原样转交给模块自身解析器的子命令
+PASSTHROUGH = {'batch', 'relay', 'bench'}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="卫星通信链路工具")
+    parser.add_argument('--kernels', choices=('auto', 'numpy', 'numba'), default=None,
+                        help="串行递推计算核的后端（见 kernels.py），默认 auto")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    tx = commands.add_parser('tx', help="处理音频并经中继发送")
+    tx.add_argument('-i', '--input', default=None, help="输入音频文件（默认仓库自带 BAK.wav）")
+    tx.add_argument('--relay', type=_address, default=('127.0.0.1', 8888), help="中继地址 HOST:PORT")
+    tx.add_argument('--to', type=_address, default=('127.0.0.1', 8889), help="接收端地址 HOST:PORT")
+    tx.add_argument('--capture', default=None, help="写入采集文件而不发送")
+    tx.set_defaults(func=cmd_tx)
+
+    replay = commands.add_parser('replay', help="回放采集文件")
+    replay.add_argument('capture', help="采集文件")
+    replay.add_argument('--relay', type=_address, default=None, help="经中继发送（默认直接发往 --to）")
+    replay.add_argument('--to', type=_address, default=('127.0.0.1', 8889), help="接收端地址 HOST:PORT")
+    replay.add_argument('--local', action='store_true', help="在本进程内送入接收流水线")
+    replay.add_argument('--codec', default='turbo', help="--local 时使用的编解码器")
+    replay.add_argument('--realtime', action='store_true', help="按采样率节拍回放")
+    replay.add_argument('--speed', type=float, default=1.0, help="节拍回放的倍速")
+    replay.add_argument('--repeat', type=int, default=1, help="重复次数")
+    replay.add_argument('--chunk', type=int, default=1 << 18, help="每块采样数")
+    replay.set_defaults(func=cmd_replay)
+
+    commands.add_parser('batch', help="批量处理音频文件（参数见 batch_tx.py --help）",
+                        add_help=False).set_defaults(func=cmd_batch)
+
+    rx = commands.add_parser('rx', help="启动接收端")
+    rx.add_argument('--host', default='127.0.0.1')
+    rx.add_argument('--port', type=int, default=8889)
+    rx.set_defaults(func=cmd_rx)
+
+    commands.add_parser('relay', help="启动中继（参数见 relay.py --help）",
+                        add_help=False).set_defaults(func=cmd_relay)
+
+    sim = commands.add_parser('sim', help="离散事件仿真")
+    sim.add_argument('--messages', type=int, default=10000, help="消息条数")
+    sim.add_argument('--interval', type=float, default=10.0, help="平均发送间隔 (ms)")
+    sim.add_argument('--orbit-height', type=float, default=35786, help="轨道高度 (km)")
+    sim.add_argument('--seed', type=int, default=0)
+    sim.set_defaults(func=cmd_sim)
+
+    commands.add_parser('bench', help="全链路基准测试（参数见 benchmark.py --help）",
+                        add_help=False).set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, rest = parser.parse_known_args(argv)
+    if rest and args.command not in PASSTHROUGH:
+        parser.error(f"无法识别的参数: {' '.join(rest)}")
+    if args.kernels:
+        import kernels
+        print(f"计算核后端: {kernels.use(args.kernels)}")
+    return args.func(args, rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
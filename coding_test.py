@@ -1,5 +1,5 @@
 import numpy as np
-from scipy.special import logit, expit
+import kernels
 
 class TurboEncoderDecoder:
     def __init__(self, frame_len=1024, constraint_length=3, interleaver_size=1024):
@@ -40,28 +40,14 @@ class TurboEncoderDecoder:
         返回:
             (systematic_bits, parity_bits): 系统位和校验位的元组
         """
-        state = initial_state  # 初始化编码器状态
-        systematic_bits = []   # 存储系统位
-        parity_bits = []       # 存储校验位
-        
-        for bit in data:
-            # 计算反馈项: 取状态的第0位和第1位进行异或
-            feedback = (state & 0b1) ^ ((state >> 1) & 0b1)
-            # 计算编码器输入: 输入比特与反馈异或
-            input_bit = int(bit) ^ feedback
-            
-            # 计算系统位(直接输出输入比特)
-            systematic_bit = int(bit)
-            # 计算校验位: 输入比特与状态的第0位和第1位异或
-            parity_bit = input_bit ^ (state & 0b1) ^ ((state >> 1) & 0b1)
-            
-            systematic_bits.append(systematic_bit)
-            parity_bits.append(parity_bit)
-            
-            # 更新状态: 新输入移入高位，原状态右移
-            state = ((input_bit << (self.constraint_length-2)) | (state >> 1))
-        
-        return np.array(systematic_bits), np.array(parity_bits)
+        # 状态递推由 kernels 的当前后端执行（批维度上一次处理多帧，这里为单帧）
+        # 反馈项为状态第0位与第1位的异或，编码器输入 = 输入比特 ^ 反馈，
+        # 校验位 = 编码器输入 ^ 状态第0位 ^ 状态第1位，新输入移入高位、原状态右移
+        systematic_bits = np.asarray(data).astype(np.int64)
+        parity_bits = kernels.rsc_encode(systematic_bits[None, :], self.constraint_length,
+                                         initial_state)[0].astype(np.int64)
+        
+        return systematic_bits, parity_bits
     
     def encode(self, data):
         """
@@ -73,27 +59,21 @@ class TurboEncoderDecoder:
         返回:
             encoded_frames: 编码后的比特流列表(每帧包含系统位 + 第一校验位 + 第二校验位)
         """
-        encoded_frames = []  # 存储所有编码后的帧
-
+        # 验证帧长度是否符合要求
         for frame in data:
-            # 验证帧长度是否符合要求
             if len(frame) != self.frame_len:
                 raise ValueError(f"输入帧必须为{self.frame_len}bit，当前为{len(frame)}bit")
-            
-            frame = np.array([int(bit) for bit in frame])  # 转换为整数数组
-            
-            # 第一个RSC编码器编码原始数据
-            systematic1, parity1 = self._rsc_encode(frame)
-            
-            # 交织输入数据(按预定义的交织顺序重新排列)
-            interleaved_data = frame[self.interleaver]
-            
-            # 第二个RSC编码器编码交织后的数据
-            systematic2, parity2 = self._rsc_encode(interleaved_data)
-            
-            # 合并输出: 系统位 + 第一校验位 + 第二校验位
-            encoded = np.concatenate([systematic1, parity1, parity2])
-            encoded_frames.append(encoded)
+        if not len(data):
+            return []
+
+        frames = np.array([np.asarray(frame).astype(np.int64) for frame in data])  # 转换为整数数组
+        
+        # 两个RSC编码器分别编码原始数据与交织后的数据，整批帧一次递推
+        parity1 = kernels.rsc_encode(frames, self.constraint_length).astype(np.int64)
+        parity2 = kernels.rsc_encode(frames[:, self.interleaver], self.constraint_length).astype(np.int64)
+        
+        # 合并输出: 系统位 + 第一校验位 + 第二校验位
+        encoded_frames = list(np.concatenate([frames, parity1, parity2], axis=1))
         
         return encoded_frames  
     
@@ -112,14 +92,10 @@ class TurboEncoderDecoder:
         systematic = received[:num_bits]  # 提取系统位
         parity = received[num_bits:]      # 提取校验位
         
-        llr = np.zeros(num_bits)          # 初始化对数似然比数组
-        new_extrinsic = np.zeros(num_bits)  # 初始化外部信息数组
-        
-        for i in range(num_bits):
-            # 简化计算 - 假设系统位和校验位受到相同噪声影响
-            # 实际Log-MAP算法会考虑网格图和前向/后向递归
-            llr[i] = 2 * systematic[i] + extrinsic_info[i]
-            new_extrinsic[i] = llr[i] - extrinsic_info[i] - 2 * systematic[i]
+        # 简化计算 - 假设系统位和校验位受到相同噪声影响
+        # 实际Log-MAP算法会考虑网格图和前向/后向递归
+        llr = 2 * systematic + extrinsic_info
+        new_extrinsic = llr - extrinsic_info - 2 * systematic
         
         return llr, new_extrinsic
     
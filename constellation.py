@@ -0,0 +1,319 @@
+"""
+多星星座模型
+卫星位置、星间链路(ISL)与地面站可见性均以数组形式批量计算；
+最短时延路由预先算成路由表（卫星间下一跳表 + 地面站对入/出星表），
+消息转发时每一跳只做一次查表，拓扑变化时按受影响的源节点增量刷新
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from orbit_geometry import EARTH_RADIUS, LIGHT_SPEED, MU, geodetic_to_ecef
+from satellite_communication import account_delivery, create_group, resolve_targets, shared_payload
+
+
+def walker_positions(num_planes, sats_per_plane, altitude_km, inclination_deg, t=0.0, phasing=1):
+    """
+    Walker-delta 星座在时刻 t (秒) 的卫星位置（圆轨道，忽略地球自转）
+    :return: (num_planes * sats_per_plane, 3) 坐标数组，编号为 plane * sats_per_plane + slot
+    """
+    total = num_planes * sats_per_plane
+    radius = EARTH_RADIUS + altitude_km
+    mean_motion = np.sqrt(MU / radius ** 3)
+    plane = np.repeat(np.arange(num_planes), sats_per_plane)
+    slot = np.tile(np.arange(sats_per_plane), num_planes)
+
+    raan = 2 * np.pi * plane / num_planes
+    anomaly = (2 * np.pi * slot / sats_per_plane + 2 * np.pi * phasing * plane / total
+               + mean_motion * t)
+    inc = np.radians(inclination_deg)
+
+    x = radius * (np.cos(raan) * np.cos(anomaly) - np.sin(raan) * np.sin(anomaly) * np.cos(inc))
+    y = radius * (np.sin(raan) * np.cos(anomaly) + np.cos(raan) * np.sin(anomaly) * np.cos(inc))
+    z = radius * np.sin(anomaly) * np.sin(inc)
+    return np.stack([x, y, z], axis=-1)
+
+
+def grid_links(num_planes, sats_per_plane):
+    """'+'形星间链路：同轨前后相邻 + 相邻轨道同槽位，返回 (M, 2) 无向边数组"""
+    idx = np.arange(num_planes * sats_per_plane).reshape(num_planes, sats_per_plane)
+    intra = np.stack([idx.ravel(), np.roll(idx, -1, axis=1).ravel()], axis=1)
+    inter = np.stack([idx[:-1].ravel(), idx[1:].ravel()], axis=1)
+    return np.concatenate([intra, inter])
+
+
+class Constellation:
+    """
+    多星星座
+    对外接口与 satellite_communication.Satellite 一致（register_station / receive_from_ground / sim），
+    因此 GroundStation 可以直接接入星座
+    """
+    def __init__(self, positions, links, min_elevation_deg=10.0, sim=None):
+        """
+        :param positions: (N, 3) 卫星位置 (km)
+        :param links: (M, 2) 星间链路（无向）
+        :param min_elevation_deg: 地面站可见的最低仰角
+        :param sim: des.Simulator，转发按事件调度（毫秒）
+        """
+        self.positions = np.asarray(positions, dtype=float)
+        self.links = np.asarray(links, dtype=np.int64).reshape(-1, 2)
+        self.min_elevation = np.radians(min_elevation_deg)
+        self.sim = sim
+        self.processing_delay = 5  # ms 每颗卫星的星上处理时延
+
+        self.ground_stations = {}   # {name: GroundStation}
+        self.groups = {}            # 组播组 {组名: [地面站名]}
+        self.deliveries = {}        # 每个接收站的投递统计 {name: {'messages', 'bytes'}}
+        self.station_names = []
+        self.station_index = {}     # {name: station_names 中的下标}
+        self.station_positions = np.zeros((0, 3))
+        self.stats = {'forwarded': 0, 'hops': 0, 'full_refresh': 0, 'incremental_refresh': 0}
+
+        self.link_delay = self._link_delays()
+        self._index_links()
+        self._build_routes()
+
+    @property
+    def num_satellites(self):
+        return len(self.positions)
+
+    def _link_delays(self):
+        """所有星间链路的单跳传播时延 (ms)，向量化计算"""
+        a, b = self.links[:, 0], self.links[:, 1]
+        return np.linalg.norm(self.positions[a] - self.positions[b], axis=1) / LIGHT_SPEED * 1000
+
+    def _index_links(self):
+        """链路 → self.links 中的下标（两个方向都登记），转发时按下标取 link_delay"""
+        self.link_index = {}
+        for i, (a, b) in enumerate(self.links.tolist()):
+            self.link_index[(a, b)] = i
+            self.link_index[(b, a)] = i
+
+    def _graph(self):
+        n = self.num_satellites
+        a, b = self.links[:, 0], self.links[:, 1]
+        weight = self.link_delay + self.processing_delay
+        return csr_matrix((np.concatenate([weight, weight]),
+                           (np.concatenate([a, b]), np.concatenate([b, a]))), shape=(n, n))
+
+    def _next_hops(self, predecessors, sources):
+        """由前驱矩阵批量推出下一跳：从目的节点沿前驱回溯，直到前驱是源节点"""
+        n = self.num_satellites
+        src = np.asarray(sources)[:, None]
+        hop = np.broadcast_to(np.arange(n), (len(src), n)).copy()
+        rows = np.arange(len(src))[:, None]
+        while True:
+            prev = predecessors[rows, hop]
+            move = (prev != src) & (prev >= 0)
+            if not move.any():
+                break
+            hop = np.where(move, prev, hop)
+        hop[predecessors[rows, hop] < 0] = -1   # 不可达
+        hop[rows[:, 0], src[:, 0]] = src[:, 0]  # 自身
+        return hop
+
+    def _build_routes(self, sources=None):
+        """计算（部分）源卫星的最短路：sources为None时全量刷新"""
+        graph = self._graph()
+        if sources is None:
+            self.distance, predecessors = dijkstra(graph, return_predecessors=True)
+            self.next_hop = self._next_hops(predecessors, np.arange(self.num_satellites))
+            self.stats['full_refresh'] += 1
+        elif len(sources):
+            dist, predecessors = dijkstra(graph, indices=sources, return_predecessors=True)
+            self.distance[sources] = dist
+            self.next_hop[sources] = self._next_hops(predecessors, sources)
+            self.stats['incremental_refresh'] += 1
+        self._build_station_routes()
+
+    def _visibility(self):
+        """(地面站数, 卫星数) 可见性矩阵及对应单程时延 (ms)"""
+        g = self.station_positions[:, None, :]
+        d = self.positions[None, :, :] - g
+        rng = np.linalg.norm(d, axis=2)
+        up = g / np.linalg.norm(g, axis=2, keepdims=True)
+        sin_elev = np.sum(d * up, axis=2) / rng
+        visible = sin_elev >= np.sin(self.min_elevation)
+        return visible, rng / LIGHT_SPEED * 1000
+
+    def _build_station_routes(self):
+        """
+        地面站对路由表：对每对 (源站, 目的站) 选出总时延最小的 (上行星, 下行星)
+        route_table[(源站, 目的站)] = (总时延ms, 上行星, 下行星)
+        """
+        self.route_table = {}
+        if not self.station_names:
+            self.access_delay = np.zeros((0, self.num_satellites))
+            return
+        visible, self.access_delay = self._visibility()   # 上/下行单程时延，转发时查表
+        access = np.where(visible, self.access_delay, np.inf)
+        # 逐源站计算，避免构造 (站, 站, 星, 星) 四维数组
+        for ia, name_a in enumerate(self.station_names):
+            cost = access[ia][:, None] + self.distance + self.processing_delay  # (上行星, 下行星)
+            for ib, name_b in enumerate(self.station_names):
+                if ia == ib:
+                    continue
+                total = cost + access[ib][None, :]
+                flat = int(np.argmin(total))
+                up, down = divmod(flat, self.num_satellites)
+                if np.isfinite(total[up, down]):
+                    self.route_table[(name_a, name_b)] = (float(total[up, down]), up, down)
+
+    def register_station(self, ground_station, lat_deg=0.0, lon_deg=0.0):
+        """注册地面站（需给出经纬度）"""
+        self.ground_stations[ground_station.name] = ground_station
+        self.deliveries[ground_station.name] = {'messages': 0, 'bytes': 0}
+        self.station_index[ground_station.name] = len(self.station_names)
+        self.station_names.append(ground_station.name)
+        self.station_positions = np.vstack([self.station_positions, geodetic_to_ecef(lat_deg, lon_deg)])
+        self._build_station_routes()
+
+    def create_group(self, group_name, members):
+        """创建组播组，成员须已注册（与单星模型相同）"""
+        create_group(self.groups, self.ground_stations, group_name, members)
+
+    def resolve_targets(self, target):
+        """把地面站名 / 组名 / 名称列表展开为去重后的地面站名列表"""
+        return resolve_targets(self.groups, self.ground_stations, target)
+
+    def set_links(self, links):
+        """替换星间链路集合（链路建立/中断），只刷新受影响的源卫星"""
+        old = {tuple(sorted(l)) for l in self.links.tolist()}
+        self.links = np.asarray(links, dtype=np.int64).reshape(-1, 2)
+        new = {tuple(sorted(l)) for l in self.links.tolist()}
+        self.link_delay = self._link_delays()
+        self._index_links()
+
+        removed = np.array(sorted(old - new), dtype=np.int64).reshape(-1, 2)
+        added = np.array(sorted(new - old), dtype=np.int64).reshape(-1, 2)
+        removed_weight = (np.linalg.norm(self.positions[removed[:, 0]] - self.positions[removed[:, 1]], axis=1)
+                          / LIGHT_SPEED * 1000 + self.processing_delay)
+        self._refresh(removed, removed_weight, added)
+
+    def set_positions(self, positions, tolerance_ms=1e-3):
+        """更新卫星位置；时延变化超过 tolerance_ms 的链路才触发刷新"""
+        old_delay = self.link_delay
+        self.positions = np.asarray(positions, dtype=float)
+        self.link_delay = self._link_delays()
+        changed = np.abs(self.link_delay - old_delay) > tolerance_ms
+        if changed.all():
+            self._build_routes()
+            return
+        grew = changed & (self.link_delay > old_delay)
+        shrank = changed & ~grew
+        self._refresh(self.links[grew], old_delay[grew] + self.processing_delay, self.links[shrank])
+
+    def _refresh(self, worse, worse_weight, better):
+        """
+        增量刷新
+        :param worse: 变差（中断或时延增大）的链路，只重算最短路树经过这些链路的源卫星
+        :param worse_weight: 这些链路变化前的代价
+        :param better: 变好（新建或时延减小）的链路，可能改善任意源卫星的路由
+        """
+        if len(better):
+            # 链路变好影响面难以界定，直接全量重算
+            self._build_routes()
+            return
+        if not len(worse):
+            self._build_station_routes()
+            return
+        d = self.distance
+        affected = np.zeros(self.num_satellites, dtype=bool)
+        for (u, v), weight in zip(worse, worse_weight):
+            # 源s的最短路树使用(u,v)的必要条件：d[s,u] 与 d[s,v] 恰好相差该链路原代价
+            affected |= np.isclose(np.abs(d[:, u] - d[:, v]), weight)
+        self._build_routes(np.flatnonzero(affected))
+
+    def route(self, sender_name, target_name):
+        """:return: (总时延ms, 上行星, 下行星)，O(1)查表"""
+        entry = self.route_table.get((sender_name, target_name))
+        if entry is None:
+            raise ValueError(f"{sender_name} → {target_name} 当前没有可用路由")
+        return entry
+
+    def path(self, sender_name, target_name):
+        """:return: 经过的卫星编号列表（逐跳查下一跳表）"""
+        _, up, down = self.route(sender_name, target_name)
+        hops = [up]
+        while hops[-1] != down:
+            hops.append(int(self.next_hop[hops[-1], down]))
+        return hops
+
+    def calculate_propagation_delay(self, station1, station2):
+        """两地面站之间的端到端时延 (ms)，含各星处理时延"""
+        return self.route(station1, station2)[0]
+
+    def receive_from_ground(self, sender_name, target_name, message, on_delivered=None):
+        """
+        地面站上行消息，沿路由表逐跳转发
+        仿真模式下每一跳作为一个事件调度；否则直接投递并返回端到端时延 (ms)
+        :param target_name: 地面站名、组名或名称列表；多个目标时各自按路由表转发，
+                            共享同一份只读载荷（不复制），返回值为各目标中最大的端到端时延
+        """
+        targets = self.resolve_targets(target_name)
+        routes = [(name, self.route(sender_name, name)) for name in targets]
+        message, nbytes = shared_payload(message)
+
+        if self.sim is None:
+            for name, _ in routes:
+                self.stats['forwarded'] += 1
+                account_delivery(self.deliveries, name, nbytes)
+                self.ground_stations[name].receive_data(sender_name, message)
+            return max(total for _, (total, _, _) in routes)
+
+        ia = self.station_index[sender_name]
+        for name, (_, up, down) in routes:
+            self.sim.schedule(self.access_delay[ia, up] + self.processing_delay, self._on_hop, up, down,
+                              sender_name, name, message, nbytes, self.sim.now, on_delivered)
+        return None
+
+    def _on_hop(self, current, down, sender_name, target_name, message, nbytes, start, on_delivered):
+        """仿真事件：消息在卫星 current 处理完毕，查表转发到下一跳或下行"""
+        if current == down:
+            downlink = self.access_delay[self.station_index[target_name], down]
+            self.sim.schedule(downlink, self._on_downlink, sender_name, target_name, message, nbytes,
+                              start, on_delivered)
+            return
+        nxt = int(self.next_hop[current, down])
+        delay = self.link_delay[self.link_index[(current, nxt)]]
+        self.stats['hops'] += 1
+        self.sim.schedule(delay + self.processing_delay, self._on_hop, nxt, down,
+                          sender_name, target_name, message, nbytes, start, on_delivered)
+
+    def _on_downlink(self, sender_name, target_name, message, nbytes, start, on_delivered):
+        self.stats['forwarded'] += 1
+        account_delivery(self.deliveries, target_name, nbytes)
+        self.ground_stations[target_name].receive_data(sender_name, message)
+        if on_delivered is not None:
+            on_delivered(float(self.sim.now - start), target_name)
+
+
+# 使用示例
+if __name__ == "__main__":
+    import time
+
+    positions = walker_positions(24, 22, 550, 53)
+    links = grid_links(24, 22)
+    start = time.time()
+    const = Constellation(positions, links)
+    print(f"{const.num_satellites} 颗卫星, {len(links)} 条星间链路, 路由表构建 {time.time() - start:.3f} s")
+
+    class _Station:
+        def __init__(self, name):
+            self.name = name
+
+        def receive_data(self, sender, message):
+            pass
+
+    for name, lat, lon in [("北京", 39.9, 116.4), ("酒泉", 40.0, 98.5), ("喀什", 39.5, 76.0)]:
+        const.register_station(_Station(name), lat, lon)
+
+    print("北京 → 喀什:", const.route("北京", "喀什"), "路径:", const.path("北京", "喀什"))
+
+    const.create_group("西部", ["酒泉", "喀什"])
+    print(f"北京 → 西部组播: {const.receive_from_ground('北京', '西部', np.zeros(1024, np.float32)):.2f} ms, "
+          f"投递统计: {const.deliveries}")
+
+    start = time.time()
+    cut = links[np.arange(len(links)) != 5]
+    const.set_links(cut)
+    print(f"断开一条链路后增量刷新 {time.time() - start:.3f} s, 统计: {const.stats}")
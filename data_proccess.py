@@ -1,14 +1,28 @@
-import moderate_test, coding_test, protocol, ADtest
+import os
+import moderate_test, fec, protocol
 import numpy as np
 
-def send_data_proccess():
-    turbo = coding_test.TurboEncoderDecoder()
+# 默认输入音频（仓库自带）
+AUDIO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BAK.wav')
+
+def send_data_proccess(file_path=AUDIO_FILE, source_coder=None, codec='turbo'):
+    """
+    :param source_coder: source_coding.SourceCoder，设置后在 AD 与信道编码之间压缩，接收端须使用相同参数
+    :param codec: fec 注册表中的编解码器名称（'turbo' / 'conv'）
+    """
+    import ADtest  # AD/DA 依赖 librosa、matplotlib，只在实际处理音频时导入
+
+    channel_codec = fec.create(codec)
     _modulate = moderate_test.AmplitudeModem()
     _protocol = protocol.ProtocolHandler()
 
-    fig, quantized_signal, frames = ADtest.SoundOperation.sound_ADtrans("/home/hyrozine/py_work/BAK.wav")
+    fig, quantized_signal, frames = ADtest.SoundOperation.sound_ADtrans(file_path)
+
+    if source_coder is not None:
+        frames = source_coder.encode(frames)
+        print(f"source_frames:{len(frames)} ratio:{source_coder.ratio:.3f}")
 
-    encode_bits = turbo.encode(frames)
+    encode_bits = channel_codec.encode(frames)
     print(f"ecode_bits_len:{len(encode_bits[0])}")
     # print(encode_bits[0])
 
@@ -22,8 +36,30 @@ def send_data_proccess():
 
     return _modulate_bits
 
-def recieve_data_proccess(modulate_bits):
-    turbo = coding_test.TurboEncoderDecoder()
+def capture_data_proccess(capture_path, file_path=AUDIO_FILE, source_coder=None, codec='turbo'):
+    """
+    与 send_data_proccess 相同的发送处理，但把调制信号逐帧流式写入采集文件（见 capture.py），
+    不在内存中保留整批调制信号
+    :return: 采集文件路径
+    """
+    import ADtest, capture
+
+    channel_codec = fec.create(codec)
+    _modulate = moderate_test.AmplitudeModem()
+    _protocol = protocol.ProtocolHandler()
+
+    fig, quantized_signal, frames = ADtest.SoundOperation.sound_ADtrans(file_path, plot=False)
+    if source_coder is not None:
+        frames = source_coder.encode(frames)
+    send_p = _protocol.build_frames(channel_codec.encode(frames))
+    capture.write_frames(capture_path, _modulate, send_p)
+    print(f"capture:{capture_path} frames:{len(send_p)}")
+    return capture_path
+
+def recieve_data_proccess(modulate_bits, source_coder=None, codec='turbo'):
+    import ADtest
+
+    channel_codec = fec.create(codec)
     _modulate = moderate_test.AmplitudeModem()
     _protocol = protocol.ProtocolHandler()
 
@@ -34,9 +70,12 @@ def recieve_data_proccess(modulate_bits):
     recieve_p = _protocol.parse_frames(demodulate_bits)
     print(f"recieve_p_len:{len(recieve_p[0])}")
 
-    decode_bits = turbo.decode(recieve_p)
+    decode_bits = channel_codec.decode(recieve_p)
     print(f"decode_bits_len:{len(decode_bits[0])}")
 
+    if source_coder is not None:
+        decode_bits = source_coder.decode(decode_bits)
+
     fig, filtered_signal, t_reconstructed = ADtest.SoundOperation.sound_DAtrans(decode_bits)
     print(f"da_bits:{len(filtered_signal)}")
 
@@ -0,0 +1,92 @@
+"""
+离散事件仿真引擎
+虚拟时钟 + 最小堆事件队列：时间直接跳到下一个事件，不依赖墙上时钟，
+同一时刻的事件按调度顺序执行，因此结果可重复
+时间单位由调用方约定（卫星模型使用毫秒）
+"""
+import heapq
+import itertools
+import random
+
+
+class Event:
+    """已调度的事件，可通过 Simulator.cancel 取消"""
+    __slots__ = ('time', 'callback', 'args', 'cancelled')
+
+    def __init__(self, time, callback, args):
+        self.time = time
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Simulator:
+    def __init__(self, start=0.0, seed=None):
+        """
+        :param start: 虚拟时钟起点
+        :param seed: 随机数种子，仿真中的随机量应统一取自 self.rng
+        """
+        self.now = start
+        self.rng = random.Random(seed)
+        self.events_processed = 0
+        self._queue = []
+        self._counter = itertools.count()
+
+    def schedule(self, delay, callback, *args) -> Event:
+        """在 delay 之后执行 callback(*args)"""
+        if delay < 0:
+            raise ValueError("不能调度到过去的时刻")
+        return self.schedule_at(self.now + delay, callback, *args)
+
+    def schedule_at(self, time, callback, *args) -> Event:
+        """在绝对时刻 time 执行 callback(*args)"""
+        if time < self.now:
+            raise ValueError("不能调度到过去的时刻")
+        event = Event(time, callback, args)
+        heapq.heappush(self._queue, (time, next(self._counter), event))
+        return event
+
+    @staticmethod
+    def cancel(event: Event):
+        """取消事件（惰性删除，出队时跳过）"""
+        event.cancelled = True
+
+    @property
+    def pending(self):
+        """队列中尚未执行的事件数（含已取消的）"""
+        return len(self._queue)
+
+    def peek(self):
+        """下一个事件的时刻，队列为空返回None"""
+        return self._queue[0][0] if self._queue else None
+
+    def step(self) -> bool:
+        """执行下一个事件，队列为空返回False"""
+        while self._queue:
+            time, _, event = heapq.heappop(self._queue)
+            if event.cancelled:
+                continue
+            self.now = time
+            event.callback(*event.args)
+            self.events_processed += 1
+            return True
+        return False
+
+    def run(self, until=None, max_events=None):
+        """
+        运行仿真
+        :param until: 运行到该时刻为止（时钟停在 until）
+        :param max_events: 最多执行的事件数
+        :return: 结束时的虚拟时刻
+        """
+        executed = 0
+        while self._queue:
+            if until is not None and self._queue[0][0] > until:
+                break
+            if max_events is not None and executed >= max_events:
+                return self.now
+            if self.step():
+                executed += 1
+        if until is not None and until > self.now:
+            self.now = until
+        return self.now
@@ -0,0 +1,198 @@
+"""
+前向纠错编解码器接口与注册表
+所有编解码器按批处理：encode 输入 (帧数, frame_len) 的0/1数组，输出 (帧数, coded_len)；
+decode 输入 (帧数, coded_len) 的接收值（硬判决0/1或[0,1]内的软值），输出 (帧数, frame_len)
+    turbo  包装 coding_test.TurboEncoderDecoder，码率1/3，迭代译码
+    conv   K=7 (171,133) 卷积码，码率1/2，尾比特归零，滑动窗口 Viterbi 译码（回溯深度 5K，
+           各帧各块与64状态一起做加比选）。译码时延：numba 后端与 turbo 相当（8×1024 比特约 2 ms），
+           纯 numpy 后端约为 turbo 的 1.5~2.5 倍（逐步加比选的循环留在 Python 层），
+           对时延敏感时应安装 numba（见本文件示例与 benchmark.py）
+"""
+import numpy as np
+import coding_test
+import kernels
+
+SOFT_LEVELS = 15  # Viterbi 软判决量化级数（4 比特），分支度量与路径度量为小整数，按 int16 计算
+
+
+class Codec:
+    """编解码器基类"""
+    name = None
+
+    def __init__(self, frame_len=1024):
+        self.frame_len = frame_len    # 每帧信息比特数
+        self.coded_len = frame_len    # 每帧编码后比特数
+
+    @property
+    def rate(self):
+        return self.frame_len / self.coded_len
+
+    def _check(self, frames, length):
+        frames = np.asarray(frames)
+        if frames.ndim == 1:
+            frames = frames[None, :]
+        if frames.shape[1] != length:
+            raise ValueError(f"{self.name} 输入帧必须为{length}bit，当前为{frames.shape[1]}bit")
+        return frames
+
+    def encode(self, frames) -> np.ndarray:
+        raise NotImplementedError
+
+    def decode(self, frames) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TurboCodec(Codec):
+    """Turbo 码（码率1/3）"""
+    name = 'turbo'
+
+    def __init__(self, frame_len=1024, iterations=6):
+        super().__init__(frame_len)
+        self.turbo = coding_test.TurboEncoderDecoder(frame_len=frame_len, interleaver_size=frame_len)
+        self.iterations = iterations
+        self.coded_len = 3 * frame_len
+
+    def encode(self, frames):
+        return np.array(self.turbo.encode(self._check(frames, self.frame_len)))
+
+    def decode(self, frames):
+        return np.array(self.turbo.decode(self._check(frames, self.coded_len), iterations=self.iterations))
+
+
+class ConvolutionalCodec(Codec):
+    """
+    卷积码 + 滑动窗口 Viterbi 译码
+    状态为最近 K-1 个输入比特（最新的在最高位）；每帧末尾补 K-1 个0使编码器回到0状态。
+    编码输出再补0到8的整数倍，以满足协议层按字节组帧。
+    译码把每帧的网格切成 window 步的块，每块前后各多算 depth 步（前段让路径度量收敛，后段为回溯深度），
+    只保留中间 window 步；所有帧的所有块作为一批同时加比选，串行步数从 帧长+K-1 降到 window+2*depth，
+    判决时延也只有 window+depth 步
+    """
+    name = 'conv'
+
+    def __init__(self, frame_len=1024, constraint_length=7, generators=(0o171, 0o133), window=64, depth=None):
+        """
+        :param window: 每块保留的译码步数
+        :param depth: 回溯深度（也是块前的收敛长度），默认 5 倍约束长度
+        """
+        super().__init__(frame_len)
+        self.window = window
+        self.depth = 5 * constraint_length if depth is None else depth
+        self.constraint_length = constraint_length
+        self.memory = constraint_length - 1
+        self.num_states = 1 << self.memory
+        self.generators = generators
+        self.trellis_len = len(generators) * (frame_len + self.memory)
+        self.coded_len = -(-self.trellis_len // 8) * 8
+
+        # 生成多项式的抽头，taps[g][j] 对应 j 个时刻之前的输入（最高位为当前输入）
+        self.taps = np.array([[(g >> (self.memory - j)) & 1 for j in range(constraint_length)]
+                              for g in generators], dtype=np.uint8)
+
+        # 网格：next = (u << (K-2)) | (s >> 1)；每个 next 状态的两个前驱为 ((next & mask) << 1) | b
+        states = np.arange(self.num_states)
+        self.input_bit = states >> (self.memory - 1)
+        self.prev = np.stack([((states & (self.num_states // 2 - 1)) << 1) | b for b in (0, 1)], axis=1)
+        register = (self.input_bit[:, None] << self.memory) | self.prev          # (S, 2) 含当前输入的7位寄存器
+        self.expected = np.stack([self._parity(register & g) for g in generators], axis=-1)
+        # 期望输出编号；next 状态 u*half + j 的两个前驱为 2j、2j+1，形状为 (2, half)
+        out_index = (self.expected << np.arange(len(generators) - 1, -1, -1)).sum(axis=-1)
+        self.out0 = out_index[:, 0].reshape(2, -1)
+        self.out1 = out_index[:, 1].reshape(2, -1)
+
+    @staticmethod
+    def _parity(x):
+        x = np.asarray(x, dtype=np.int64)
+        bits = 0
+        while np.any(x):
+            bits ^= x & 1
+            x = x >> 1
+        return bits
+
+    def encode(self, frames):
+        frames = self._check(frames, self.frame_len).astype(np.uint8)
+        batch = len(frames)
+        padded = np.concatenate([np.zeros((batch, self.memory), np.uint8), frames,
+                                 np.zeros((batch, self.memory), np.uint8)], axis=1)
+        steps = self.frame_len + self.memory
+        out = np.zeros((batch, steps, len(self.generators)), dtype=np.uint8)
+        for j in range(self.constraint_length):
+            # j 个时刻之前的输入
+            delayed = padded[:, self.memory - j:self.memory - j + steps]
+            out ^= delayed[:, :, None] * self.taps[:, j]
+        out = out.reshape(batch, -1)
+        return np.pad(out, ((0, 0), (0, self.coded_len - self.trellis_len)))
+
+    def decode(self, frames):
+        received = self._check(frames, self.coded_len)[:, :self.trellis_len]
+        batch = len(received)
+        steps = self.frame_len + self.memory
+        n = len(self.generators)
+        window, depth = self.window, self.depth
+        span = window + 2 * depth
+        blocks = -(-steps // window)
+
+        # 软值量化为 0..SOFT_LEVELS；帧前与尾比特之后补确定的0（编码器从0状态出发、最后停在0状态，
+        # 相当于一直输入0），首块与末块因此自然收敛到0状态
+        levels = np.rint(np.clip(received, 0, 1) * SOFT_LEVELS).astype(np.int16).reshape(batch, steps, n)
+        padded = np.zeros((batch, blocks * window + 2 * depth, n), dtype=np.int16)
+        padded[:, depth:depth + steps] = levels
+        # 第 k 块覆盖 [k*window - depth, (k+1)*window + depth)；转成 (步, n, 帧*块)
+        spans = np.lib.stride_tricks.sliding_window_view(padded, span, axis=1)[:, ::window]
+        spans = spans.transpose(3, 2, 0, 1).reshape(span, n, batch * blocks)
+
+        # 分支度量只有 2^n 种期望输出：distance[t, o, c] 为第 t 步接收值与输出 o 的距离（硬判决时为汉明距离的倍数），
+        # 每个比特期望为 0/1 时的代价分别为 level 与 SOFT_LEVELS - level
+        cost = (spans, SOFT_LEVELS - spans)
+        distance = np.empty((span, 1 << n, batch * blocks), dtype=np.int16)
+        for o in range(1 << n):
+            bits = (o >> np.arange(n - 1, -1, -1)) & 1
+            distance[:, o] = cost[bits[0]][:, 0]
+            for i in range(1, n):
+                distance[:, o] += cost[bits[i]][:, i]
+
+        # 加比选与回溯沿时间方向串行，由 kernels 的当前后端执行；各块从度量最小的状态回溯，
+        # 块前 depth 步的判决用不到，回溯到块内第 depth 步为止
+        decisions, metrics = kernels.viterbi_forward(distance, self.out0, self.out1)
+        bits = kernels.viterbi_traceback(decisions[depth:], self.input_bit, self.prev, metrics.argmin(axis=0))
+        bits = bits[:window].reshape(window, batch, blocks).transpose(1, 2, 0)
+        return bits.reshape(batch, -1)[:, :self.frame_len]
+
+
+CODECS = {
+    'turbo': TurboCodec,
+    'conv': ConvolutionalCodec,
+}
+
+
+def register(name, factory):
+    """注册新的编解码器，factory(frame_len=..., **kwargs) 返回 Codec 实例"""
+    CODECS[name] = factory
+
+
+def create(name='turbo', **kwargs) -> Codec:
+    if name not in CODECS:
+        raise ValueError(f"未知编解码器: {name}，可选 {sorted(CODECS)}")
+    return CODECS[name](**kwargs)
+
+
+# 使用示例
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 2, (8, 1024))
+
+    for name in CODECS:
+        codec = create(name)
+        encoded = codec.encode(frames)
+        # 随机翻转约1%的比特
+        flips = rng.random(encoded.shape) < 0.01
+        received = encoded ^ flips
+
+        start = time.perf_counter()
+        decoded = codec.decode(received)
+        elapsed = time.perf_counter() - start
+        errors = int(np.sum(decoded != frames))
+        print(f"{name:>6}: 码率 {codec.rate:.3f}, 信道误码 {int(flips.sum())}, "
+              f"译码后误码 {errors}, 译码 {len(frames)} 帧耗时 {elapsed * 1000:.1f} ms")
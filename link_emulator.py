@@ -0,0 +1,184 @@
+"""
+链路仿真（供中继的仿真模式使用）
+按路由配置传播时延、抖动、丢包(Bernoulli / Gilbert-Elliott)和令牌桶限速，
+每条消息的投递时刻一次算出，再用事件循环定时器投递，不阻塞、不 sleep
+"""
+import asyncio
+import itertools
+import random
+
+
+class BernoulliLoss:
+    """独立丢包：每条消息以概率 p 丢弃"""
+    def __init__(self, p=0.0, rng=None):
+        self.p = p
+        self.rng = rng or random.Random()
+
+    def drop(self):
+        return self.rng.random() < self.p
+
+
+class GilbertElliottLoss:
+    """
+    Gilbert-Elliott 突发丢包模型
+    好/坏两状态马尔可夫链，每条消息先按转移概率换状态，再按所在状态的丢包率丢弃
+    """
+    def __init__(self, p_good_to_bad=0.01, p_bad_to_good=0.3, loss_good=0.0, loss_bad=0.5, rng=None):
+        self.p_good_to_bad = p_good_to_bad
+        self.p_bad_to_good = p_bad_to_good
+        self.loss_good = loss_good
+        self.loss_bad = loss_bad
+        self.rng = rng or random.Random()
+        self.bad = False
+
+    def drop(self):
+        if self.bad:
+            if self.rng.random() < self.p_bad_to_good:
+                self.bad = False
+        elif self.rng.random() < self.p_good_to_bad:
+            self.bad = True
+        return self.rng.random() < (self.loss_bad if self.bad else self.loss_good)
+
+    @property
+    def average_loss(self):
+        """稳态平均丢包率"""
+        p_bad = self.p_good_to_bad / (self.p_good_to_bad + self.p_bad_to_good)
+        return p_bad * self.loss_bad + (1 - p_bad) * self.loss_good
+
+
+class TokenBucket:
+    """
+    令牌桶限速
+    不做等待，只计算消息可以离开的时刻：令牌不足时预支，离开时刻顺延
+    """
+    def __init__(self, rate_bps, burst_bytes=64 * 1024):
+        """
+        :param rate_bps: 限速 (比特/秒)
+        :param burst_bytes: 桶深 (字节)
+        """
+        if rate_bps <= 0:
+            raise ValueError("限速必须为正数")
+        self.rate = rate_bps / 8  # 字节/秒
+        self.burst = burst_bytes
+        self.tokens = burst_bytes
+        self.last = None
+
+    def reserve(self, nbytes, now):
+        """:return: 该消息的离开时刻"""
+        if self.last is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        self.tokens -= nbytes
+        if self.tokens >= 0:
+            return now
+        return now - self.tokens / self.rate
+
+
+class LinkProfile:
+    """单条路由的链路参数"""
+    def __init__(self, delay_ms=0.0, jitter_ms=0.0, loss=None, rate_bps=None,
+                 burst_bytes=64 * 1024, reorder=False, rng=None):
+        """
+        :param delay_ms: 单向时延 (毫秒)
+        :param jitter_ms: 时延抖动的标准差 (毫秒)，叠加正态分布随机量
+        :param loss: 丢包模型(BernoulliLoss / GilbertElliottLoss)，None表示不丢包
+        :param rate_bps: 带宽上限 (比特/秒)，None表示不限速
+        :param burst_bytes: 令牌桶深度 (字节)
+        :param reorder: 是否允许抖动导致乱序，False时投递时刻单调不减
+        """
+        self.delay = delay_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.loss = loss
+        self.bucket = TokenBucket(rate_bps, burst_bytes) if rate_bps else None
+        self.reorder = reorder
+        self.rng = rng or random.Random()
+        self.last_delivery = 0.0
+
+    @classmethod
+    def from_satellite(cls, satellite, station1=None, station2=None, **kwargs):
+        """
+        由卫星模型推导时延：传播时延 + 星上处理时延
+        :param satellite: satellite_communication.Satellite 实例
+        """
+        delay_ms = satellite.calculate_propagation_delay(station1, station2) + satellite.processing_delay
+        return cls(delay_ms=delay_ms, **kwargs)
+
+    def delivery_time(self, nbytes, now):
+        """:return: 投递时刻，丢弃时返回None"""
+        if self.loss is not None and self.loss.drop():
+            return None
+        depart = self.bucket.reserve(nbytes, now) if self.bucket else now
+        delay = self.delay
+        if self.jitter:
+            delay = max(0.0, delay + self.rng.gauss(0, self.jitter))
+        deliver = depart + delay
+        if not self.reorder:
+            deliver = max(deliver, self.last_delivery)
+            self.last_delivery = deliver
+        return deliver
+
+
+class LinkEmulator:
+    """
+    按路由对消息施加链路损伤
+    投递通过 loop.call_at 定时器完成，同时在途的消息数由信号量限制（背压）
+    """
+    def __init__(self, default=None, routes=None, max_in_flight=100000):
+        """
+        :param default: 未单独配置的路由使用的 LinkProfile
+        :param routes: {(receiver_host, receiver_port): LinkProfile}
+        :param max_in_flight: 最大在途消息数，达到后发送方被挂起
+        """
+        self.default = default or LinkProfile()
+        self.routes = dict(routes or {})
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.timers = {}     # {编号: TimerHandle} 尚未到投递时刻的消息
+        self.tasks = set()   # 正在投递的消息
+        self.counter = itertools.count()
+        self.stats = {'submitted': 0, 'dropped': 0, 'delivered': 0}
+
+    def set_route(self, address, profile: LinkProfile):
+        self.routes[address] = profile
+
+    async def submit(self, address, data, deliver):
+        """
+        提交一条消息
+        :param data: 消息字节段序列
+        :param deliver: 协程函数 deliver(address, data)，到达投递时刻后调用
+        """
+        self.stats['submitted'] += 1
+        loop = asyncio.get_running_loop()
+        profile = self.routes.get(address, self.default)
+        when = profile.delivery_time(sum(len(part) for part in data), loop.time())
+        if when is None:
+            self.stats['dropped'] += 1
+            return
+
+        await self.in_flight.acquire()
+        key = next(self.counter)
+        self.timers[key] = loop.call_at(when, self._fire, key, address, data, deliver)
+
+    def _fire(self, key, address, data, deliver):
+        del self.timers[key]
+        task = asyncio.ensure_future(deliver(address, data))
+        self.tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self.tasks.discard(task)
+        self.in_flight.release()
+        self.stats['delivered'] += 1
+
+    async def close(self, flush=True):
+        """:param flush: True时等待所有在途消息投递完毕，否则直接丢弃"""
+        loop = asyncio.get_running_loop()
+        if flush:
+            while self.timers:
+                last = max(h.when() for h in self.timers.values())
+                await asyncio.sleep(max(0.0, last - loop.time()))
+        else:
+            for handle in self.timers.values():
+                handle.cancel()
+            self.timers.clear()
+        if self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
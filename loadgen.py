@@ -0,0 +1,230 @@
+"""
+中继链路压测工具
+N 个模拟地面站按固定速率经中继向本地接收端发送消息，统计吞吐量与时延分布
+全部在本机运行：默认在同一进程内启动中继与接收端，也可用 --relay 指向外部中继
+"""
+import argparse
+import asyncio
+import struct
+import time
+import numpy as np
+import relay, wire
+
+# 每条消息载荷前缀：地面站编号(4B) | 序号(4B) | 计划发送时刻(8B, ns)
+STAMP = struct.Struct('>IIq')
+
+
+class LatencyHistogram:
+    """
+    HDR风格的对数-线性时延直方图（单位：微秒）
+    每个2的幂区间再均分为64个子桶，相对误差不超过 1/64，内存固定
+    """
+    SUB_BITS = 7
+    SUB_COUNT = 1 << SUB_BITS
+    HALF = SUB_COUNT // 2
+
+    def __init__(self, max_value=3600 * 10**6):
+        self.max_value = max_value
+        self.counts = np.zeros(self._index(max_value) + 1, dtype=np.int64)
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value):
+        if value < self.SUB_COUNT:
+            return value
+        shift = value.bit_length() - self.SUB_BITS
+        return self.SUB_COUNT + (shift - 1) * self.HALF + ((value >> shift) - self.HALF)
+
+    def _value(self, index):
+        """桶的上界（包含）"""
+        if index < self.SUB_COUNT:
+            return index
+        shift = (index - self.SUB_COUNT) // self.HALF + 1
+        mantissa = (index - self.SUB_COUNT) % self.HALF + self.HALF
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value):
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def percentile(self, p):
+        """:param p: 百分位 (0~100)"""
+        if not self.total:
+            return 0
+        target = max(1, int(np.ceil(self.total * p / 100)))
+        index = int(np.searchsorted(np.cumsum(self.counts), target))
+        return min(self._value(index), self.max)
+
+    def summary(self):
+        return {
+            'count': self.total,
+            'min': self.min or 0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max,
+        }
+
+    def distribution(self, ticks=(50, 75, 90, 95, 99, 99.9, 99.99, 100)):
+        """按百分位输出分布表"""
+        lines = [f"{'百分位':>10} {'时延(us)':>12}"]
+        for p in ticks:
+            lines.append(f"{p:>10} {self.percentile(p):>12}")
+        return "\n".join(lines)
+
+
+class SinkReceiver:
+    """本地接收端：只解析时间戳并记录时延，不做解调解码"""
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.received = 0
+        self.bytes = 0
+        self.last_received_ns = None  # 最后一条消息到达的时刻 (monotonic_ns)
+        self.server = None
+
+    async def start(self, host, port):
+        self.server = await asyncio.start_server(self._handle, host, port)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                frame = await wire.read_frame(reader)
+                if frame is None:
+                    break
+                payload = frame[2][2]
+                _, _, planned = STAMP.unpack_from(payload)
+                now = time.monotonic_ns()
+                self.histogram.record((now - planned) // 1000)
+                self.last_received_ns = now
+                self.received += 1
+                self.bytes += len(payload)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            print(f"丢弃非法消息并断开连接: {e}")
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+async def ground_station(station_id, relay_addr, receiver_addr, rate, payload_size, deadline, counters):
+    """
+    模拟地面站：按计划时刻开环发送（计划时刻计入时延，避免协同遗漏）
+    """
+    _, writer = await asyncio.open_connection(*relay_addr)
+    payload = np.zeros(max(payload_size, STAMP.size), dtype=np.uint8)
+    interval_ns = int(1e9 / rate)
+    planned = time.monotonic_ns()
+    seq = 0
+    try:
+        while planned < deadline:
+            delay = (planned - time.monotonic_ns()) / 1e9
+            if delay > 0:
+                await asyncio.sleep(delay)
+            STAMP.pack_into(payload, 0, station_id, seq, planned)
+            wire.write_array(writer, receiver_addr[0], receiver_addr[1], payload)
+            await writer.drain()
+            counters['sent'] += 1
+            seq += 1
+            planned += interval_ns
+    finally:
+        writer.close()
+
+
+async def run(stations=10, rate=100.0, payload_size=1024, duration=10.0,
+              relay_addr=None, receiver_host='127.0.0.1', receiver_port=9889, loss_rate=0.0):
+    """
+    执行一次压测
+    :param stations: 并发地面站数
+    :param rate: 每个地面站的发送速率 (条/秒)
+    :param payload_size: 每条消息载荷字节数
+    :param duration: 持续时间 (秒)
+    :param relay_addr: 外部中继地址 (host, port)，None表示在本进程内启动中继
+    :return: 统计结果字典
+    """
+    sink = SinkReceiver()
+    await sink.start(receiver_host, receiver_port)
+
+    local_relay = None
+    if relay_addr is None:
+        local_relay = relay.RelayServer('127.0.0.1', 0, loss_rate=loss_rate)
+        await local_relay.start()
+        relay_addr = (local_relay.host, local_relay.port)
+
+    counters = {'sent': 0}
+    start = time.monotonic_ns()
+    deadline = start + int(duration * 1e9)
+    await asyncio.gather(*(
+        ground_station(i, relay_addr, (receiver_host, receiver_port), rate, payload_size, deadline, counters)
+        for i in range(stations)
+    ))
+
+    # 等待在途消息到达；吞吐按收到最后一条消息的时刻计算，不计入等待丢失消息的时间
+    settle = time.monotonic() + 2.0
+    while sink.received < counters['sent'] and time.monotonic() < settle:
+        await asyncio.sleep(0.01)
+    end = sink.last_received_ns if sink.last_received_ns is not None else time.monotonic_ns()
+    elapsed = max(end - start, 1) / 1e9
+
+    if local_relay is not None:
+        await local_relay.close()
+    await sink.close()
+
+    return {
+        'stations': stations,
+        'sent': counters['sent'],
+        'received': sink.received,
+        'lost': counters['sent'] - sink.received,
+        'elapsed_s': round(elapsed, 3),
+        'msgs_per_s': round(sink.received / elapsed, 1),
+        'mbytes_per_s': round(sink.bytes / elapsed / 1e6, 3),
+        'latency_us': sink.histogram.summary(),
+        'histogram': sink.histogram,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="中继链路并发压测")
+    parser.add_argument('--stations', type=int, default=10, help="并发地面站数")
+    parser.add_argument('--rate', type=float, default=100.0, help="每站发送速率 (条/秒)")
+    parser.add_argument('--payload', type=int, default=1024, help="载荷字节数")
+    parser.add_argument('--duration', type=float, default=10.0, help="持续时间 (秒)")
+    parser.add_argument('--relay', default=None, help="外部中继 host:port，默认进程内启动")
+    parser.add_argument('--receiver-port', type=int, default=9889, help="本地接收端端口")
+    parser.add_argument('--loss', type=float, default=0.0, help="进程内中继的丢包率")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    relay_addr = None
+    if args.relay:
+        host, port = args.relay.rsplit(':', 1)
+        relay_addr = (host, int(port))
+
+    result = asyncio.run(run(args.stations, args.rate, args.payload, args.duration,
+                             relay_addr, receiver_port=args.receiver_port, loss_rate=args.loss))
+    histogram = result.pop('histogram')
+    for key, value in result.items():
+        print(f"{key}: {value}")
+    print(histogram.distribution())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
-import moderate_test, coding_test, ADtest, protocol
+import sys
+import moderate_test, fec, ADtest, protocol
 import numpy as np
 
 if __name__ == "__main__":
 
-    turbo = coding_test.TurboEncoderDecoder()
+    # 可在命令行指定编解码器：python main.py conv
+    codec = fec.create(sys.argv[1] if len(sys.argv) > 1 else 'turbo')
     _modulate = moderate_test.AmplitudeModem()
     _protocol = protocol.ProtocolHandler()
 
@@ -12,7 +14,7 @@ if __name__ == "__main__":
     # frames = [original_data,original_data]
     frames = ADtest.get_frame()
 
-    encode_bits = turbo.encode(frames)
+    encode_bits = codec.encode(frames)
     print(f"ecode_bits_len:{len(encode_bits[0])}")
     # print(encode_bits[0])
 
@@ -45,7 +47,7 @@ if __name__ == "__main__":
 #     print(f"误码率 (BER): {ber:.2%}")
 #     print(f"误码数: {error_count}/{compared_bits}")
 
-    decode_bits = turbo.decode(recieve_p)
+    decode_bits = codec.decode(recieve_p)
     print(f"decode_bits_len:{len(decode_bits[0])}")
 
     #    # 误码率计算
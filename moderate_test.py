@@ -1,13 +1,16 @@
 import numpy as np
 
 class AmplitudeModem:
-    def __init__(self, carrier_freq=1000, sample_rate=44100, bit_duration=0.1):
+    def __init__(self, carrier_freq=1000, sample_rate=44100, bit_duration=0.1, samples_per_bit=None):
         """
         初始化调制解调器参数
         :param carrier_freq: 载波频率 (Hz)
         :param sample_rate: 采样率 (Hz)
         :param bit_duration: 每个比特的持续时间 (秒)
+        :param samples_per_bit: 直接指定每比特采样数（如按采集文件重建调制器），此时忽略 bit_duration
         """
+        if samples_per_bit is not None:
+            bit_duration = samples_per_bit / sample_rate
         if carrier_freq <= 0:
             raise ValueError("载波频率必须为正数")
         if sample_rate <= 2 * carrier_freq:
@@ -18,7 +21,7 @@ class AmplitudeModem:
         self.carrier_freq = carrier_freq
         self.sample_rate = sample_rate
         self.bit_duration = bit_duration
-        self.samples_per_bit = int(sample_rate * bit_duration)
+        self.samples_per_bit = int(sample_rate * bit_duration) if samples_per_bit is None else int(samples_per_bit)
         
         # 预计算载波信号
         t = np.linspace(0, self.bit_duration, self.samples_per_bit, endpoint=False)
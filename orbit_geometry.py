@@ -0,0 +1,225 @@
+"""
+轨道几何
+在时间网格上批量计算 (时刻, 地面站, 卫星) 的斜距、仰角和径向速度（多普勒），
+并预先整理出按 (站, 星) 分组、按开始时刻排序的可见窗口索引：
+“t 时刻谁可见”是每对 (站, 星) 一次二分查找，单条消息的时延是一次表内插值，不再逐次做三角运算
+"""
+import bisect
+import numpy as np
+
+EARTH_RADIUS = 6371.0          # km
+LIGHT_SPEED = 299792.0         # km/s
+MU = 398600.4418               # 地球引力常数 km^3/s^2
+EARTH_ROTATION = 7.2921159e-5  # 地球自转角速度 rad/s
+
+
+def geodetic_to_ecef(lat_deg, lon_deg, alt_km=0.0):
+    """经纬度（球形地球）转地心直角坐标 (km)，支持数组输入"""
+    lat = np.radians(lat_deg)
+    lon = np.radians(lon_deg)
+    r = EARTH_RADIUS + np.asarray(alt_km, dtype=float)
+    return np.stack([r * np.cos(lat) * np.cos(lon),
+                     r * np.cos(lat) * np.sin(lon),
+                     r * np.sin(lat)], axis=-1)
+
+
+def circular_orbit_ecef(t, altitude_km, inclination_deg, raan_deg=0.0, phase_deg=0.0):
+    """
+    圆轨道卫星在地固系(ECEF)中的位置和速度
+    :param t: (T,) 时刻 (秒)
+    :param altitude_km, inclination_deg, raan_deg, phase_deg: (N,) 或标量轨道参数
+    :return: (位置 (T, N, 3) km, 速度 (T, N, 3) km/s)
+    """
+    t = np.asarray(t, dtype=float)[:, None]
+    altitude, inc, raan, phase = np.broadcast_arrays(
+        np.atleast_1d(altitude_km).astype(float), np.radians(np.atleast_1d(inclination_deg)),
+        np.radians(np.atleast_1d(raan_deg)), np.radians(np.atleast_1d(phase_deg)))
+    radius = EARTH_RADIUS + altitude
+    n = np.sqrt(MU / radius ** 3)
+    u = phase + n * t                                 # 纬度幅角 (T, N)
+    lon_node = raan - EARTH_ROTATION * t              # 升交点在地固系中的经度
+
+    cu, su = np.cos(u), np.sin(u)
+    cl, sl = np.cos(lon_node), np.sin(lon_node)
+    ci, si = np.cos(inc), np.sin(inc)
+    position = radius[..., None] * np.stack([cl * cu - sl * su * ci,
+                                             sl * cu + cl * su * ci,
+                                             su * si], axis=-1)
+
+    # 对时间求导：du/dt = n，d(lon_node)/dt = -EARTH_ROTATION
+    du, dl = n, -EARTH_ROTATION
+    velocity = radius[..., None] * np.stack([
+        -sl * dl * cu - cl * su * du - (cl * dl * su + sl * cu * du) * ci,
+        cl * dl * cu - sl * su * du + (-sl * dl * su + cl * cu * du) * ci,
+        cu * du * si], axis=-1)
+    return position, velocity
+
+
+def look_angles(station_ecef, sat_position, sat_velocity):
+    """
+    批量计算观测量
+    :param station_ecef: (S, 3) 地面站坐标
+    :param sat_position, sat_velocity: (T, N, 3)
+    :return: (斜距 km, 仰角 rad, 径向速度 km/s)，形状均为 (T, S, N)；径向速度为正表示远离
+    """
+    g = np.asarray(station_ecef, dtype=float)[None, :, None, :]          # (1, S, 1, 3)
+    d = sat_position[:, None, :, :] - g                                   # (T, S, N, 3)
+    rng = np.linalg.norm(d, axis=-1)
+    up = g / np.linalg.norm(g, axis=-1, keepdims=True)
+    elevation = np.arcsin(np.clip(np.sum(d * up, axis=-1) / rng, -1.0, 1.0))
+    range_rate = np.sum(d * sat_velocity[:, None, :, :], axis=-1) / rng   # 地面站在地固系中静止
+    return rng, elevation, range_rate
+
+
+class ContactWindowIndex:
+    """
+    可见窗口索引
+    窗口按 (站, 星) 和按站分组，组内按开始时刻排序，并附结束时刻的前缀最大值（单调不减）：
+    组内第一个结束时刻 >= t 的窗口就是前缀最大值上的一次二分查找，与窗口长短无关。
+    同一 (站, 星) 的窗口互不重叠，t 时刻至多落在其中一个内
+    """
+    def __init__(self, windows):
+        """:param windows: [(开始, 结束, 地面站编号, 卫星编号)]"""
+        self.windows = sorted(windows)
+        pairs, stations = {}, {}
+        for start, end, s, n in self.windows:
+            pairs.setdefault((s, n), []).append((start, end))
+            stations.setdefault(s, []).append((start, end, n))
+        self.pairs = {key: self._with_reach(group) for key, group in pairs.items()}
+        self.stations = {s: self._with_reach(group) for s, group in stations.items()}
+        self.station_satellites = {}   # {站: [有窗口的卫星]}
+        for s, n in self.pairs:
+            self.station_satellites.setdefault(s, []).append(n)
+
+    @staticmethod
+    def _with_reach(group):
+        """:return: (按开始时刻排序的窗口, 结束时刻的前缀最大值)"""
+        return group, np.maximum.accumulate([w[1] for w in group]).tolist()
+
+    @staticmethod
+    def _first_ending_after(indexed, t):
+        """:return: 组内第一个结束时刻 >= t 的窗口，没有返回None"""
+        group, reach = indexed
+        i = bisect.bisect_left(reach, t)
+        return group[i] if i < len(group) else None
+
+    @classmethod
+    def from_visibility(cls, times, visible):
+        """
+        由可见性布尔表提取窗口
+        :param times: (T,) 时间网格
+        :param visible: (T, S, N) 布尔数组
+        """
+        times = np.asarray(times, dtype=float)
+        padded = np.concatenate([np.zeros((1,) + visible.shape[1:], bool), visible,
+                                 np.zeros((1,) + visible.shape[1:], bool)])
+        edges = np.diff(padded.astype(np.int8), axis=0)
+        rise_t, rise_s, rise_n = np.nonzero(edges == 1)
+        fall_t, fall_s, fall_n = np.nonzero(edges == -1)
+        # 同一 (站, 星) 的升沿与降沿一一对应，按 (站, 星, 时刻) 排序后配对
+        rise = np.lexsort((rise_t, rise_n, rise_s))
+        fall = np.lexsort((fall_t, fall_n, fall_s))
+        last = len(times) - 1
+        windows = [(float(times[rise_t[r]]), float(times[min(fall_t[f] - 1, last)]),
+                    int(rise_s[r]), int(rise_n[r]))
+                   for r, f in zip(rise, fall)]
+        return cls(windows)
+
+    def visible_at(self, t, station=None):
+        """:return: t 时刻处于可见窗口内的 [(地面站编号, 卫星编号, 开始, 结束)]，按开始时刻排序"""
+        if station is None:
+            keys = self.pairs
+        else:
+            keys = [(station, n) for n in self.station_satellites.get(station, [])]
+        found = []
+        for s, n in keys:
+            window = self._first_ending_after(self.pairs[(s, n)], t)
+            if window is not None and window[0] <= t:
+                found.append((window[0], window[1], s, n))
+        return [(s, n, start, end) for start, end, s, n in sorted(found)]
+
+    def next_contact(self, t, station, satellite=None):
+        """:return: t 之后（含进行中）的第一个窗口 (开始, 结束, 卫星编号)，没有返回None"""
+        if satellite is not None:
+            window = self._first_ending_after(self.pairs.get((station, satellite), ([], [])), t)
+            return None if window is None else (window[0], window[1], satellite)
+        window = self._first_ending_after(self.stations.get(station, ([], [])), t)
+        return None if window is None else tuple(window)
+
+
+class OrbitGeometry:
+    """
+    预计算的轨道几何表
+    在 [0, duration] 的时间网格上一次性算出所有 (站, 星) 的斜距/仰角/多普勒，
+    之后的时延与多普勒查询都是插值
+    """
+    def __init__(self, stations, orbits, duration_s=86400.0, step_s=10.0,
+                 min_elevation_deg=10.0, carrier_hz=1000.0):
+        """
+        :param stations: {名称: (纬度, 经度[, 高度km])}
+        :param orbits: [{'altitude_km':..., 'inclination_deg':..., 'raan_deg':..., 'phase_deg':...}]
+        :param duration_s: 预计算时长 (秒)
+        :param step_s: 时间网格步长 (秒)
+        :param min_elevation_deg: 可见的最低仰角
+        :param carrier_hz: 计算多普勒频移所用的载波频率
+        """
+        self.station_names = list(stations)
+        self.station_index = {name: i for i, name in enumerate(self.station_names)}
+        coords = np.array([tuple(stations[name]) + (0.0,) * (3 - len(stations[name]))
+                           for name in self.station_names], dtype=float)
+        self.station_ecef = geodetic_to_ecef(coords[:, 0], coords[:, 1], coords[:, 2])
+        self.carrier_hz = carrier_hz
+
+        self.times = np.arange(0.0, duration_s + step_s, step_s)
+        elements = {key: np.array([o.get(key, 0.0) for o in orbits], dtype=float)
+                    for key in ('altitude_km', 'inclination_deg', 'raan_deg', 'phase_deg')}
+        position, velocity = circular_orbit_ecef(self.times, **elements)
+        self.range, self.elevation, self.range_rate = look_angles(self.station_ecef, position, velocity)
+        self.visible = self.elevation >= np.radians(min_elevation_deg)
+        self.contacts = ContactWindowIndex.from_visibility(self.times, self.visible)
+
+    def _interp(self, table, station, satellite, t):
+        return np.interp(t, self.times, table[:, self.station_index[station], satellite])
+
+    def slant_range_km(self, station, satellite, t):
+        return self._interp(self.range, station, satellite, t)
+
+    def delay_ms(self, station, satellite, t):
+        """地面站与卫星之间的单程传播时延 (ms)"""
+        return self.slant_range_km(station, satellite, t) / LIGHT_SPEED * 1000
+
+    def elevation_deg(self, station, satellite, t):
+        return np.degrees(self._interp(self.elevation, station, satellite, t))
+
+    def doppler_hz(self, station, satellite, t):
+        """下行多普勒频移 (Hz)，卫星接近时为正"""
+        return -self._interp(self.range_rate, station, satellite, t) / LIGHT_SPEED * self.carrier_hz
+
+    def visible_at(self, t, station=None):
+        """:return: t 时刻可见的 [(地面站名, 卫星编号)]"""
+        index = None if station is None else self.station_index[station]
+        return [(self.station_names[s], n) for s, n, _, _ in self.contacts.visible_at(t, index)]
+
+
+# 使用示例
+if __name__ == "__main__":
+    import time
+
+    stations = {"北京地面站": (39.9, 116.4), "酒泉地面站": (40.0, 98.5), "三亚地面站": (18.3, 109.5)}
+    orbits = [{'altitude_km': 550, 'inclination_deg': 53, 'raan_deg': 30 * i, 'phase_deg': 45 * i}
+              for i in range(12)]
+    orbits.append({'altitude_km': 35786, 'inclination_deg': 0, 'raan_deg': 110})  # GEO
+
+    start = time.time()
+    geo = OrbitGeometry(stations, orbits, duration_s=86400, step_s=10)
+    print(f"预计算 {geo.range.shape} 几何表与 {len(geo.contacts.windows)} 个可见窗口: {time.time() - start:.2f} s")
+
+    print("t=3600s 北京可见:", geo.visible_at(3600, "北京地面站"))
+    print(f"GEO 北京单程时延: {geo.delay_ms('北京地面站', 12, 3600):.2f} ms, "
+          f"仰角 {geo.elevation_deg('北京地面站', 12, 3600):.1f}°")
+    window = geo.contacts.next_contact(0, geo.station_index["北京地面站"], 0)
+    if window:
+        mid = (window[0] + window[1]) / 2
+        print(f"LEO 0号星下一次过境 {window[0]:.0f}-{window[1]:.0f} s, "
+              f"入境多普勒 {geo.doppler_hz('北京地面站', 0, window[0]):.4f} Hz, "
+              f"中点时延 {geo.delay_ms('北京地面站', 0, mid):.2f} ms")
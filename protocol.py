@@ -1,14 +1,27 @@
 import struct
 import crcmod
+import numpy as np
+import kernels
 from typing import Union, List, Dict, Tuple
 
+# 带序号帧的类型字段
+FRAME_DATA = 0
+FRAME_ACK = 1
+FRAME_NACK = 2
+FRAME_SKIP = 3  # 发送端放弃某序号，通知接收端越过该序号
+
+SEQ_MODULUS = 1 << 16  # 序号字段为2字节，按模运算回绕
+
+
 class ProtocolHandler:
     """
     增强版协议处理器（支持多组比特流输入和多帧处理）
     帧格式：[帧头(2B) | 长度(2B) | 数据(NB) | CRC16(2B)]
+    带序号帧格式：[帧头(2B) | 类型(1B) | 序号(2B) | 长度(2B) | 数据(NB) | CRC16(2B)]
     """
     def __init__(self):
         self.header = b'\xAA\x55'
+        self.seq_header = b'\xAA\x56'  # 带序号帧使用独立帧头，与普通帧互不干扰
         self.crc16 = crcmod.predefined.mkCrcFun('crc-16')
         self.header_bits = self._bytes_to_bits(self.header)
 
@@ -125,6 +138,72 @@ class ProtocolHandler:
 
         return result
 
+    def build_seq_frame(self, payload: List[int], seq: int, frame_type: int = FRAME_DATA) -> List[int]:
+        """
+        组带序号的单帧（供可靠传输层使用）
+        :param payload: 比特流数组，元素为0或1，长度为8的倍数
+        :param seq: 帧序号(0~65535)
+        :param frame_type: 帧类型 FRAME_DATA / FRAME_ACK / FRAME_NACK / FRAME_SKIP
+        :return: 完整帧的比特流数组
+        """
+        if not 0 <= seq < SEQ_MODULUS:
+            raise ValueError(f"序号超出范围: {seq}")
+        payload_bytes = self._bits_to_bytes(payload)
+        frame_bytes = (self.seq_header + struct.pack('>BHH', frame_type, seq, len(payload_bytes))
+                       + payload_bytes)
+        frame_bytes += struct.pack('>H', self.crc16(frame_bytes))
+        return self._bytes_to_bits(frame_bytes)
+
+    def parse_seq_frame(self, frame_bits: List[int]) -> Dict:
+        """
+        解析带序号的单帧
+        CRC校验失败时仍尽量返回帧头中的序号（'seq'不为None），便于接收端回复NACK
+        """
+        result = {
+            'valid': False,
+            'type': None,
+            'seq': None,
+            'payload_bits': None,
+            'error': None,
+        }
+
+        try:
+            frame_bytes = self._bits_to_bytes(frame_bits)
+
+            # 帧头2B + 类型1B + 序号2B + 长度2B + CRC2B = 最小9B
+            if len(frame_bytes) < 9:
+                result['error'] = "数据长度不足"
+                return result
+
+            if frame_bytes[:2] != self.seq_header:
+                result['error'] = "帧头不匹配"
+                return result
+
+            frame_type, seq, length = struct.unpack('>BHH', frame_bytes[2:7])
+            result['type'] = frame_type
+            result['seq'] = seq
+
+            if len(frame_bytes) < 9 + length:
+                result['error'] = f"数据不完整（需要:{9+length} 实际:{len(frame_bytes)})"
+                return result
+
+            frame_bytes = frame_bytes[:9+length]
+            received_crc = struct.unpack('>H', frame_bytes[-2:])[0]
+            calculated_crc = self.crc16(frame_bytes[:-2])
+            if received_crc != calculated_crc:
+                result['error'] = f"CRC校验失败（接收:{hex(received_crc)} 计算:{hex(calculated_crc)})"
+                return result
+
+            result.update({
+                'valid': True,
+                'payload_bits': self._bytes_to_bits(frame_bytes[7:-2]),
+            })
+
+        except Exception as e:
+            result['error'] = f"解析异常: {str(e)}"
+
+        return result
+
     def _find_header(self, bits: List[List[int]]) -> Union[int, None]:
         """
         在比特流中查找帧头位置（支持二维数组输入）
@@ -132,30 +211,16 @@ class ProtocolHandler:
         :param bits: 由多个01数组组成的二维数组，例如 [[0,1,0], [1,0,1], ...]
         :return: 帧头起始位置（数组索引），找不到返回None
         """
-        # 确保header_bits是普通列表而不是numpy数组
-        header_bits = list(self.header_bits)
-        # print(header_bits)
-        
-        # 将二维数组展平为一维列表以便比较
-        flattened_bits = [bit for sublist in bits for bit in sublist]
-        # print(bits)
-        # print(flattened_bits)
-        
-        for i in range(len(flattened_bits) - len(header_bits) + 1):
-            # 获取当前窗口的比特片段
-            window = flattened_bits[i:i+len(header_bits)]
-            # 逐个比较比特位
-            if all(w == h for w, h in zip(window, header_bits)):
-                # 返回原始二维数组中的索引位置
-                # 计算对应的二维数组索引
-                array_index = 0
-                bit_count = 0
-                for arr in bits:
-                    if i < bit_count + len(arr):
-                        return array_index
-                    bit_count += len(arr)
-                    array_index += 1
-        return None
+        # 将二维数组展平后逐位搜索帧头（由 kernels 的当前后端执行）
+        lengths = [len(arr) for arr in bits]
+        if not sum(lengths):
+            return None
+        flattened_bits = np.concatenate([np.asarray(arr, dtype=np.uint8).ravel() for arr in bits])
+        i = kernels.find_pattern(flattened_bits, np.asarray(self.header_bits, dtype=np.uint8))
+        if i < 0:
+            return None
+        # 返回原始二维数组中的索引位置
+        return int(np.searchsorted(np.cumsum(lengths), i, side='right'))
 
 
     @staticmethod
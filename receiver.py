@@ -1,34 +1,55 @@
-import socket
-import data_proccess
+import asyncio
+import rx_pipeline
+import wire
 
 # 接收端地址
 RECEIVER_HOST = '127.0.0.1'
 RECEIVER_PORT = 8889
 
-# 创建 TCP 套接字
-receiver_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-receiver_socket.bind((RECEIVER_HOST, RECEIVER_PORT))
-receiver_socket.listen(1)
+CHUNK_BYTES = 1 << 18  # 每次送入流水线的数据量
 
-print(f"Receiver is listening on {RECEIVER_HOST}:{RECEIVER_PORT}")
 
-while True:
-    # 接受中继节点连接
-    conn, addr = receiver_socket.accept()
+def on_audio(addr, block):
+    """每解出一个音频块时调用"""
+    print(f"[{addr}] 音频块: {len(block)} 采样")
+
+
+async def handle_connection(reader, writer):
+    addr = writer.get_extra_info('peername')
     print(f"Connected by {addr}")
+    loop = asyncio.get_running_loop()
+    # 每个连接持有独立的流水线，状态跨消息保留
+    pipeline = rx_pipeline.ReceiverPipeline()
 
     try:
         while True:
-            # 接收数据
-            tmpData = conn.recv(1024)
-            RawData = tmpData.decode()
-            recieve = data_proccess.recieve_data_proccess(RawData)
-            if not RawData:
+            header = await wire.read_header(reader)
+            if header is None:
                 break
+            _, _, dtype, _, nbytes = header
+            async for samples in wire.iter_payload(reader, dtype, nbytes, CHUNK_BYTES):
+                # 解调/解码为CPU密集操作，放到线程池中执行，事件循环继续服务其他连接
+                blocks = await loop.run_in_executor(None, pipeline.feed, samples)
+                for block in blocks:
+                    on_audio(addr, block)
 
     except Exception as e:
         print(f"Error: {e}")
     finally:
+        print(f"[{addr}] 连接关闭: {pipeline.stats}")
         # 关闭连接
-        conn.close()
-    
\ No newline at end of file
+        writer.close()
+
+
+async def main(host=RECEIVER_HOST, port=RECEIVER_PORT):
+    server = await asyncio.start_server(handle_connection, host, port)
+    print(f"Receiver is listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
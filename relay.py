@@ -1,57 +1,469 @@
-import socket
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
 import random
+import signal
+import socket
+import time
+import wire
+import link_emulator
 
 # 中继节点地址
 relay_host = '127.0.0.1'
 relay_port = 8888
 
-# 创建 TCP 套接字
-relay_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-relay_socket.bind((relay_host, relay_port))
-relay_socket.listen(1)
+LOSS_RATE = 0.001        # 0.1% 的丢包率（模拟信号传输损耗）
+POOL_SIZE = 4            # 每个接收端保持的持久连接数
+QUEUE_SIZE = 256         # 每个接收端的待转发队列上限（背压）
+STATS_INTERVAL = 5.0     # 多进程模式下工作进程上报统计的间隔 (秒)
+
+
+class ReceiverPool:
+    """
+    接收端连接池
+    每个 (receiver_host, receiver_port) 对应一个有界队列和 POOL_SIZE 条持久连接，
+    连接由后台任务持有并复用，断开后自动重连。
+    """
+    def __init__(self, pool_size=POOL_SIZE, queue_size=QUEUE_SIZE):
+        """
+        :param pool_size: 每个接收端的连接数
+        :param queue_size: 每个接收端的队列长度，队列满时发送方被挂起
+        """
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.queues = {}   # {(host, port): asyncio.Queue}
+        self.workers = {}  # {(host, port): [asyncio.Task]}
+        self.stats = {'relayed': 0, 'reconnects': 0, 'errors': 0}
+
+    async def send(self, address, data):
+        """
+        把消息放入对应接收端的队列，队列满时等待（背压）
+        :param data: wire 消息的字节段序列，原样转发
+        """
+        queue = self.queues.get(address)
+        if queue is None:
+            queue = asyncio.Queue(self.queue_size)
+            self.queues[address] = queue
+            self.workers[address] = [
+                asyncio.create_task(self._worker(address, queue))
+                for _ in range(self.pool_size)
+            ]
+        await queue.put(data)
+
+    async def _worker(self, address, queue):
+        """持有一条到接收端的持久连接，循环转发队列中的消息"""
+        writer = None
+        try:
+            while True:
+                data = await queue.get()
+                try:
+                    for attempt in range(2):
+                        try:
+                            if writer is None or writer.is_closing():
+                                _, writer = await asyncio.open_connection(*address)
+                                if attempt:
+                                    self.stats['reconnects'] += 1
+                            await self._write(writer, data)
+                            self.stats['relayed'] += 1
+                            break
+                        except OSError as e:
+                            # 连接失效，关闭后重连一次
+                            if writer is not None:
+                                writer.close()
+                            writer = None
+                            if attempt:
+                                self.stats['errors'] += 1
+                                print(f"Error: relay to {address} failed: {e}")
+                finally:
+                    queue.task_done()
+        finally:
+            if writer is not None:
+                writer.close()
+
+    @staticmethod
+    async def _write(writer, data):
+        writer.writelines(data)
+        await writer.drain()
+
+    async def close(self, timeout=5.0):
+        """等待队列中剩余消息发完（最多 timeout 秒）后关闭全部连接"""
+        if self.queues:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(q.join() for q in self.queues.values())), timeout)
+            except asyncio.TimeoutError:
+                print("Relay pool: pending messages dropped on shutdown")
+        tasks = [t for tasks in self.workers.values() for t in tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.queues.clear()
+        self.workers.clear()
+
+
+class RelayServer:
+    """
+    基于 asyncio 的中继服务器
+    并发服务多个发送端，通过 ReceiverPool 以持久连接转发到接收端
+    """
+    def __init__(self, host=relay_host, port=relay_port, loss_rate=LOSS_RATE,
+                 pool_size=POOL_SIZE, queue_size=QUEUE_SIZE, emulator=None, reuse_port=False):
+        """
+        :param emulator: link_emulator.LinkEmulator，设置后进入链路仿真模式，
+                         丢包/时延/限速均由其路由配置决定，loss_rate 不再生效
+        :param reuse_port: 以 SO_REUSEPORT 监听，多个进程共享同一端口，由内核分配连接
+        """
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self.loss_rate = loss_rate
+        self.emulator = emulator
+        self.pool = ReceiverPool(pool_size, queue_size)
+        self.server = None
+        self.clients = set()
+        self.stats = {'connections': 0, 'messages': 0, 'lost': 0}
+
+    async def start(self):
+        options = {'reuse_port': True} if self.reuse_port else {}
+        self.server = await asyncio.start_server(self._accept, self.host, self.port, **options)
+        self.port = self.server.sockets[0].getsockname()[1]  # port=0 时取系统分配的端口
+        print(f"Relay node is listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _accept(self, reader, writer):
+        """
+        start_server 的连接回调：每个连接交给单独的任务处理，由 close 统一取消并等待
+        （回调任务本身被取消时 asyncio.streams 会把 CancelledError 当作未处理异常打印）
+        """
+        task = asyncio.create_task(self._handle_client(reader, writer))
+        self.clients.add(task)
+        task.add_done_callback(self.clients.discard)
+        await asyncio.wait([task])
 
-print(f"Relay node is listening on {relay_host}:{relay_port}")
+    async def _handle_client(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        self.stats['connections'] += 1
+        try:
+            # 一个发送端连接上可以连续发送多条 wire 消息
+            while True:
+                frame = await wire.read_frame(reader)
+                if frame is None:
+                    break
+                await self.relay(*frame)
+        except asyncio.CancelledError:
+            # 关闭时被取消：清理后继续抛出，让等待方知道任务已取消
+            raise
+        except Exception as e:
+            print(f"Error: {addr}: {e}")
+        finally:
+            writer.close()
 
+    async def relay(self, receiver_host, receiver_port, data):
+        """转发一条消息（按丢包率随机丢弃，仿真模式下交给链路仿真器）"""
+        self.stats['messages'] += 1
+        address = (receiver_host, receiver_port)
+        if self.emulator is not None:
+            await self.emulator.submit(address, data, self.pool.send)
+            return
+        if random.random() < self.loss_rate:
+            self.stats['lost'] += 1
+            return
+        await self.pool.send(address, data)
 
-while True:
-    conn, addr = relay_socket.accept()
-    print(f"Connected by {addr}")
+    def snapshot(self):
+        """当前统计（中继、连接池与链路仿真器合并为一层字典）"""
+        result = dict(self.stats)
+        result.update({f'pool_{k}': v for k, v in self.pool.stats.items()})
+        if self.emulator is not None:
+            result.update({f'emulator_{k}': v for k, v in self.emulator.stats.items()
+                           if isinstance(v, (int, float))})
+        return result
+
+    async def close(self, timeout=5.0):
+        """
+        停止接受新连接，等待在途消息转发完毕后关闭
+        发送端连接最多再处理 timeout 秒，之后取消其处理任务并等待退出，再关闭连接池的工作任务
+        """
+        if self.server is not None:
+            self.server.close()
+        clients = list(self.clients)
+        if clients:
+            _, pending = await asyncio.wait(clients, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*clients, return_exceptions=True)
+            if pending:
+                print(f"Relay: {len(pending)} client connection(s) cancelled on shutdown")
+        if self.server is not None:
+            await self.server.wait_closed()
+        if self.emulator is not None:
+            await self.emulator.close()
+            print(f"Link emulator: {self.emulator.stats}")
+        await self.pool.close()
+        print(f"Relay stopped: {self.stats} {self.pool.stats}")
+
+
+def _stop_event(signals=(signal.SIGINT, signal.SIGTERM)):
+    """收到指定信号时置位的事件"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in signals:
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    return stop
+
+
+async def main(host=relay_host, port=relay_port, **kwargs):
+    relay = RelayServer(host, port, **kwargs)
+    await relay.start()
+    stop = _stop_event()
 
     try:
-        while True:
-            # 接收数据
-
-            data = conn.recv(1024)
-            decoded_data = data.decode()
-            if not decoded_data:
-                break
-            
-            ## 根据发来的地址连接receiver
-            info = {}
-            pairs = decoded_data.split(',')
-            for pair in pairs:
-                key, value = pair.split(':')
-                info[key] = value
-            
-            receiver_host = info.get('receiver_host')
-            receiver_port = int(info.get('receiver_port'))
-            receive_data = info.get('data')
-
-            receiver_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            receiver_socket.connect((receiver_host, receiver_port))
-
-
-            # 模拟信号传输损耗（丢包）
-            if random.random() < 0.001:  # 0.1% 的丢包率
-                print("Packet lost.")
-            else:
-                # 转发数据
-                receiver_socket.sendall(receive_data.encode())
-                print(f"Relayed: {receive_data}")
-
-    except Exception as e:
-        print(f"Error: {e}")
+        await stop.wait()
+    finally:
+        await relay.close()
+
+
+async def _serve_worker(index, host, port, stats_queue, interval, emulator_args, kwargs):
+    relay = RelayServer(host, port, reuse_port=True,
+                        emulator=build_emulator(emulator_args) if emulator_args else None, **kwargs)
+    await relay.start()
+    stop = _stop_event((signal.SIGTERM,))
+
+    def report(final=False):
+        try:
+            stats_queue.put_nowait((index, os.getpid(), final, relay.snapshot()))
+        except queue.Full:
+            pass
+
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                report()
     finally:
-        # 关闭连接
-        conn.close()
-    
\ No newline at end of file
+        await relay.close()
+        report(final=True)
+
+
+def _worker_main(index, host, port, stats_queue, interval, emulator_args, kwargs):
+    """工作进程入口：独立的事件循环、连接池与链路仿真器"""
+    # fork 出的子进程继承了监督进程的信号处理函数：SIGINT 忽略（由监督进程统一用 SIGTERM 停止），
+    # SIGTERM 恢复默认，事件循环启动后再由 _stop_event 接管
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    asyncio.run(_serve_worker(index, host, port, stats_queue, interval, emulator_args, kwargs))
+
+
+class RelaySupervisor:
+    """
+    多进程中继
+    N 个工作进程以 SO_REUSEPORT 共享监听端口，各自运行事件循环与接收端连接池；
+    监督进程负责拉起/重启工作进程，并汇总各进程定期上报的统计
+    """
+    def __init__(self, host=relay_host, port=relay_port, workers=None, stats_interval=STATS_INTERVAL,
+                 restart_delay=1.0, emulator_args=None, **kwargs):
+        """
+        :param workers: 工作进程数，默认 CPU 核数
+        :param emulator_args: build_parser() 解析出的参数，各工作进程据此自建链路仿真器
+        :param kwargs: 传给每个 RelayServer 的其余参数（loss_rate、pool_size、queue_size）
+        """
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise RuntimeError("当前平台不支持 SO_REUSEPORT")
+        self.host = host
+        self.port = port
+        self.num_workers = workers or os.cpu_count() or 1
+        self.stats_interval = stats_interval
+        self.restart_delay = restart_delay
+        self.emulator_args = emulator_args
+        self.kwargs = kwargs
+
+        self.stats_queue = multiprocessing.Queue(1024)
+        self.processes = {}      # {编号: Process}
+        self.started_at = {}     # {编号: 启动时刻}
+        self.worker_stats = {}   # {编号: 最近一次上报}
+        self.final_reported = {} # {编号: 最近一次上报是否为退出前的最终上报}
+        self.retired = {}        # 已退出进程的统计累计，重启后计数不丢失
+        self.unreported = 0      # 未发出最终上报就退出的进程数，其最后一次上报之后的计数未知
+        self.restarts = 0
+        self.stopping = False
+        self._reserved = None
+
+    def _reserve_port(self):
+        """port=0 时先用一个 SO_REUSEPORT 套接字占住系统分配的端口，所有工作进程绑定同一端口"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+        self._reserved = sock
+
+    def _spawn(self, index):
+        process = multiprocessing.Process(
+            target=_worker_main, name=f"relay-worker-{index}",
+            args=(index, self.host, self.port, self.stats_queue, self.stats_interval,
+                  self.emulator_args, self.kwargs))
+        process.start()
+        self.processes[index] = process
+        self.started_at[index] = time.monotonic()
+
+    def start(self):
+        if self.port == 0:
+            self._reserve_port()
+        for index in range(self.num_workers):
+            self._spawn(index)
+        print(f"Relay supervisor: {self.num_workers} workers on {self.host}:{self.port}")
+
+    def _collect(self, timeout):
+        """接收工作进程上报的统计"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                index, pid, final, stats = self.stats_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return
+            stats['pid'] = pid
+            self.worker_stats[index] = stats
+            self.final_reported[index] = final
+
+    def _retire(self, index):
+        """
+        进程退出：把它最后上报的统计并入累计值
+        意外退出（崩溃、被 SIGKILL）的进程没有最终上报，最后一次定期上报之后的计数无法得知，
+        这部分只在 unreported 中记一次，汇总值因此是下限
+        """
+        stats = self.worker_stats.pop(index, {})
+        if not self.final_reported.pop(index, False):
+            self.unreported += 1
+        for key, value in stats.items():
+            if key != 'pid':
+                self.retired[key] = self.retired.get(key, 0) + value
+
+    def check_workers(self):
+        """重启意外退出的工作进程（距上次启动不足 restart_delay 时推迟，避免崩溃循环占满CPU）"""
+        for index, process in list(self.processes.items()):
+            if process.is_alive() or self.stopping:
+                continue
+            if time.monotonic() - self.started_at[index] < self.restart_delay:
+                continue
+            print(f"Relay worker {index} (pid {process.pid}) exited with {process.exitcode}, restarting")
+            self._retire(index)
+            self.restarts += 1
+            self._spawn(index)
+
+    def aggregate(self):
+        """
+        :return: 全部工作进程（含已退出进程）的统计之和；
+            unreported > 0 时有进程丢失了最后一个上报周期的计数，各计数为下限
+        """
+        total = dict(self.retired)
+        for stats in self.worker_stats.values():
+            for key, value in stats.items():
+                if key != 'pid':
+                    total[key] = total.get(key, 0) + value
+        total['workers'] = sum(p.is_alive() for p in self.processes.values())
+        total['restarts'] = self.restarts
+        total['unreported'] = self.unreported
+        return total
+
+    def run(self, report_interval=None):
+        """运行到收到 SIGINT/SIGTERM 为止，定期打印汇总统计"""
+        report_interval = report_interval or self.stats_interval
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: setattr(self, 'stopping', True))
+        self.start()
+        last_report = time.monotonic()
+        try:
+            while not self.stopping:
+                self._collect(min(0.5, report_interval))
+                self.check_workers()
+                if time.monotonic() - last_report >= report_interval:
+                    last_report = time.monotonic()
+                    print(f"Relay stats: {self.aggregate()}")
+        finally:
+            self.stop()
+
+    def stop(self, timeout=10.0):
+        """向工作进程发送 SIGTERM，等待其转发完在途消息后退出"""
+        self.stopping = True
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._collect(0.1)
+        self.unreported += sum(not self.final_reported.get(index, False) for index in self.processes)
+        if self._reserved is not None:
+            self._reserved.close()
+            self._reserved = None
+        print(f"Relay supervisor stopped: {self.aggregate()}")
+
+
+def build_emulator(args):
+    """根据命令行参数构造链路仿真器，未开启仿真时返回None"""
+    if args.emulate is None:
+        return None
+
+    loss = None
+    if args.burst_loss:
+        loss = link_emulator.GilbertElliottLoss(*args.burst_loss)
+    elif args.loss:
+        loss = link_emulator.BernoulliLoss(args.loss)
+    options = dict(jitter_ms=args.jitter, loss=loss, rate_bps=args.rate)
+
+    if args.emulate == 'custom':
+        profile = link_emulator.LinkProfile(delay_ms=args.delay, **options)
+    else:
+        import satellite_communication
+        height = 35786 if args.emulate == 'geo' else args.orbit_height
+        profile = link_emulator.LinkProfile.from_satellite(
+            satellite_communication.Satellite(orbit_height_km=height), **options)
+    print(f"Link emulation: {args.emulate}, delay {profile.delay * 1000:.1f} ms")
+    return link_emulator.LinkEmulator(profile)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="中继节点")
+    parser.add_argument('--host', default=relay_host)
+    parser.add_argument('--port', type=int, default=relay_port)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="工作进程数，大于1时以 SO_REUSEPORT 多进程运行（0 表示CPU核数）")
+    parser.add_argument('--stats-interval', type=float, default=STATS_INTERVAL, help="多进程模式的统计汇总间隔 (秒)")
+    parser.add_argument('--emulate', choices=('geo', 'leo', 'custom'), default=None,
+                        help="链路仿真模式：geo/leo 时延由卫星模型推导，custom 使用 --delay")
+    parser.add_argument('--orbit-height', type=float, default=550, help="leo 模式的轨道高度 (km)")
+    parser.add_argument('--delay', type=float, default=0.0, help="custom 模式的单向时延 (ms)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="时延抖动标准差 (ms)")
+    parser.add_argument('--loss', type=float, default=0.0, help="Bernoulli 丢包率")
+    parser.add_argument('--burst-loss', type=float, nargs=4, default=None,
+                        metavar=('P_GB', 'P_BG', 'LOSS_G', 'LOSS_B'), help="Gilbert-Elliott 丢包参数")
+    parser.add_argument('--rate', type=float, default=None, help="带宽上限 (bit/s)")
+    return parser
+
+
+def run(args):
+    """按解析后的命令行参数运行单进程或多进程中继"""
+    if args.workers == 1:
+        asyncio.run(main(args.host, args.port, emulator=build_emulator(args)))
+        return
+    supervisor = RelaySupervisor(args.host, args.port, workers=args.workers or None,
+                                 stats_interval=args.stats_interval,
+                                 emulator_args=args if args.emulate else None)
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    run(build_parser().parse_args())
@@ -0,0 +1,164 @@
+import struct
+import numpy as np
+import moderate_test, fec, protocol
+
+
+class StreamDemodulator:
+    """
+    流式幅度解调
+    输入任意长度的采样块，按比特周期做相关检测，不足一个比特的尾部采样留到下次
+    """
+    def __init__(self, modem: moderate_test.AmplitudeModem, threshold=0.5):
+        self.samples_per_bit = modem.samples_per_bit
+        self.carrier = modem.carrier / modem.carrier_energy  # 预先归一化，相关即一次矩阵乘
+        self.threshold = threshold
+        self.pending = np.zeros(0)
+
+    def feed(self, samples) -> np.ndarray:
+        """:return: 解调出的比特 (uint8一维数组)"""
+        samples = np.asarray(samples, dtype=np.float64).ravel()
+        if self.pending.size:
+            samples = np.concatenate([self.pending, samples])
+        num_bits = len(samples) // self.samples_per_bit
+        used = num_bits * self.samples_per_bit
+        self.pending = samples[used:].copy()
+        blocks = samples[:used].reshape(num_bits, self.samples_per_bit)
+        return (blocks @ self.carrier > self.threshold).astype(np.uint8)
+
+
+class StreamDeframer:
+    """
+    流式解帧
+    在比特流中搜索帧头，帧完整到达后校验CRC并输出载荷；CRC失败时后移一位重新同步
+    """
+    def __init__(self, _protocol: protocol.ProtocolHandler, max_length=4096):
+        """
+        :param _protocol: 协议处理器(提供帧头与CRC函数)
+        :param max_length: 允许的最大载荷字节数，超过视为误同步
+        """
+        self.protocol = _protocol
+        self.header = bytes(_protocol.header_bits)  # 每个比特占一个字节，便于用 find 搜索
+        self.max_length = max_length
+        self.buffer = bytearray()
+        self.stats = {'frames': 0, 'crc_errors': 0}
+
+    def feed(self, bits) -> list:
+        """:return: 本次完整解出的载荷比特数组列表"""
+        self.buffer += np.asarray(bits, dtype=np.uint8).tobytes()
+        payloads = []
+        pos = 0
+
+        while True:
+            idx = self.buffer.find(self.header, pos)
+            if idx < 0:
+                # 保留可能是帧头前半部分的尾部比特
+                pos = max(pos, len(self.buffer) - len(self.header) + 1)
+                break
+            if len(self.buffer) - idx < 32:
+                pos = idx
+                break
+
+            length = int.from_bytes(np.packbits(np.frombuffer(bytes(self.buffer[idx+16:idx+32]), np.uint8)).tobytes(), 'big')
+            if length > self.max_length:
+                pos = idx + 1
+                continue
+            total = (6 + length) * 8
+            if len(self.buffer) - idx < total:
+                pos = idx
+                break
+
+            frame = np.packbits(np.frombuffer(bytes(self.buffer[idx:idx+total]), np.uint8)).tobytes()
+            if self.protocol.crc16(frame[:-2]) != struct.unpack('>H', frame[-2:])[0]:
+                self.stats['crc_errors'] += 1
+                pos = idx + 1
+                continue
+
+            payloads.append(np.unpackbits(np.frombuffer(frame[4:-2], np.uint8)))
+            self.stats['frames'] += 1
+            pos = idx + total
+
+        del self.buffer[:pos]
+        return payloads
+
+
+class StreamDecoder:
+    """逐帧信道译码，编解码器对象在整个连接期间复用"""
+    def __init__(self, codec: fec.Codec):
+        self.codec = codec
+        self.frame_bits = codec.coded_len
+
+    def feed(self, payloads) -> list:
+        frames = [p for p in payloads if len(p) == self.frame_bits]
+        if not frames:
+            return []
+        return list(self.codec.decode(frames))
+
+
+class StreamDA:
+    """把解码后的比特帧还原为 [-1, 1] 的音频采样块"""
+    def __init__(self, bit_depth=8):
+        if bit_depth != 8:
+            raise ValueError("目前只支持8位量化")
+        self.max_level = 2 ** bit_depth - 1
+
+    def feed(self, decoded_frames) -> list:
+        blocks = []
+        for bits in decoded_frames:
+            levels = np.packbits(np.asarray(bits, dtype=np.uint8))
+            blocks.append((2 * (levels.astype(np.float32) / self.max_level) - 1).astype(np.float32))
+        return blocks
+
+
+class ReceiverPipeline:
+    """
+    接收端增量处理流水线：流式解调 → 解帧 → 解码 → DA
+    每收到一段采样就推进各级状态，一帧完整到达即输出对应的音频块
+    """
+    def __init__(self, codec=None, modem=None, _protocol=None):
+        """:param codec: fec.Codec 实例或注册表中的名称，默认 turbo"""
+        if codec is None or isinstance(codec, str):
+            codec = fec.create(codec or 'turbo')
+        self.codec = codec
+        self.modem = modem or moderate_test.AmplitudeModem()
+        self.protocol = _protocol or protocol.ProtocolHandler()
+
+        self.demodulator = StreamDemodulator(self.modem)
+        self.deframer = StreamDeframer(self.protocol)
+        self.decoder = StreamDecoder(self.codec)
+        self.da = StreamDA()
+
+    def feed(self, samples) -> list:
+        """
+        送入一段调制信号采样
+        :return: 本次完成的音频块列表 (每块为float32一维数组)
+        """
+        bits = self.demodulator.feed(samples)
+        payloads = self.deframer.feed(bits)
+        decoded = self.decoder.feed(payloads)
+        return self.da.feed(decoded)
+
+    @property
+    def stats(self):
+        return dict(self.deframer.stats)
+
+
+# 测试代码
+if __name__ == "__main__":
+    codec = fec.create('turbo', frame_len=128)
+    modem = moderate_test.AmplitudeModem(bit_duration=0.001)
+    _protocol = protocol.ProtocolHandler()
+
+    np.random.seed(0)
+    levels = np.random.randint(0, 256, (3, 16))
+    frames = [np.unpackbits(row.astype(np.uint8)) for row in levels]
+    signal = np.asarray(modem.modulate(_protocol.build_frames(codec.encode(frames))), dtype=np.float32)
+
+    pipeline = ReceiverPipeline(codec, modem, _protocol)
+    blocks = []
+    stream = signal.ravel()
+    for start in range(0, len(stream), 1000):  # 模拟网络分段到达
+        blocks.extend(pipeline.feed(stream[start:start + 1000]))
+
+    print(f"音频块数: {len(blocks)}, 统计: {pipeline.stats}")
+    restored = np.round((np.array(blocks) + 1) / 2 * 255).astype(int)
+    print("数据是否一致:", np.array_equal(restored, levels))
@@ -1,13 +1,32 @@
 import time
+import numpy as np
 import data_proccess
 
 class GroundStation:
-    def __init__(self, name, satellite):
+    def __init__(self, name, satellite, decode=True):
+        """
+        :param name: 地面站名称
+        :param satellite: 连接的卫星
+        :param decode: 收到数据后是否执行完整的接收处理流程（大规模仿真时可关闭）
+        """
         self.name = name
         self.satellite = satellite  # 连接的卫星
+        self.decode = decode
+        self.sent = []      # 仿真模式下已完成发送的传输时间记录 [(目标, 毫秒)]
+        self.received = []  # 仿真模式下收到的消息 [(发送方, 到达时刻)]
     
     def send_data(self, target_name, message):
-        """向目标地面站发送数据"""
+        """
+        向目标地面站发送数据
+        :param target_name: 目标地面站名、已创建的组名或地面站名列表（组播时载荷只编码一次）
+        """
+        if self.satellite.sim is not None:
+            # 仿真模式：只调度事件，每个目标到达后由回调记录总时间
+            self.satellite.receive_from_ground(
+                self.name, target_name, message,
+                on_delivered=lambda total, target: self.sent.append((target, total)))
+            return
+
         print(f"\n[{self.name}] 发起通信请求 → 目标: {target_name}")
         # print(f"    ↳ 信息: '{message}'")
         
@@ -19,34 +38,136 @@ class GroundStation:
 
     def receive_data(self, sender, message):
         """接收来自卫星的数据"""
+        if self.satellite.sim is not None:
+            self.received.append((sender, self.satellite.sim.now))
+            if not self.decode:
+                return
         recieve_data1 = data_proccess.recieve_data_proccess(message)
         print(f"[{self.name}] 收到来自 {sender} 的信息: '{recieve_data1}'")
 
 
+# 以下为单星 Satellite 与多星 constellation.Constellation 共用的组播与投递统计
+
+def create_group(groups, ground_stations, group_name, members):
+    """在 groups 中创建组播组，成员须已在 ground_stations 中注册"""
+    for name in members:
+        if name not in ground_stations:
+            raise ValueError(f"目标地面站 {name} 未注册！")
+    groups[group_name] = list(members)
+
+
+def resolve_targets(groups, ground_stations, target):
+    """把地面站名 / 组名 / 名称列表展开为去重后的地面站名列表"""
+    if isinstance(target, str):
+        names = groups.get(target, [target])
+    else:
+        names = list(dict.fromkeys(target))
+    for name in names:
+        if name not in ground_stations:
+            raise ValueError(f"目标地面站 {name} 未注册！")
+    return names
+
+
+def shared_payload(message):
+    """
+    扇出前把载荷一次性转为只读 float32 数组，所有接收方共享同一份（不逐目标复制），
+    防止某个接收方改写影响其他接收方；已是 float32 数组时只取视图，不改动调用方的数组
+    :return: (只读载荷, 字节数)
+    """
+    payload = np.asarray(message, dtype=np.float32)
+    if payload is message:
+        payload = payload.view()
+    payload.flags.writeable = False
+    return payload, payload.nbytes
+
+
+def account_delivery(deliveries, target_name, nbytes):
+    """累计一次投递到 deliveries[target_name]"""
+    record = deliveries[target_name]
+    record['messages'] += 1
+    record['bytes'] += nbytes
+
+
 class Satellite:
-    def __init__(self, orbit_height_km=35786):  # 默认地球静止轨道高度
+    def __init__(self, orbit_height_km=35786, sim=None, geometry=None, geometry_index=0,
+                 transponder=None):  # 默认地球静止轨道高度
+        """
+        :param orbit_height_km: 轨道高度 (km)
+        :param sim: des.Simulator，设置后按离散事件仿真（时间单位毫秒），不再 sleep
+        :param geometry: orbit_geometry.OrbitGeometry，设置后按实际斜距计算传播时延
+        :param geometry_index: 本卫星在 geometry 轨道列表中的编号
+        :param transponder: transponder.Transponder，仿真模式下经有界缓存与限速链路转发
+        """
         self.orbit_height = orbit_height_km
+        self.geometry = geometry
+        self.geometry_index = geometry_index
+        self.transponder = transponder
         self.ground_stations = {}  # 注册的地面站字典 {name: object}
+        self.groups = {}           # 组播组 {组名: [地面站名]}
+        self.deliveries = {}       # 每个接收站的投递统计 {name: {'messages', 'bytes'}}
         self.processing_delay = 5  # ms 星上处理时延
+        self.sim = sim
+        self.busy_until = 0.0      # 仿真模式下星上处理器空闲的时刻
+        self.stats = {'forwarded': 0, 'dropped': 0, 'queue_delay_ms': 0.0, 'max_queue_delay_ms': 0.0}
     
     def register_station(self, ground_station):
         """注册地面站"""
         self.ground_stations[ground_station.name] = ground_station
+        self.deliveries[ground_station.name] = {'messages': 0, 'bytes': 0}
     
-    def calculate_propagation_delay(self, station1, station2):
-        """计算传播时延（简化版）"""
+    def create_group(self, group_name, members):
+        """创建组播组，成员须已注册"""
+        create_group(self.groups, self.ground_stations, group_name, members)
+
+    def resolve_targets(self, target):
+        """把地面站名 / 组名 / 名称列表展开为去重后的地面站名列表"""
+        return resolve_targets(self.groups, self.ground_stations, target)
+
+    def _hop_delays(self, sender_name, targets):
+        """:return: (上行时延, {目标: 下行时延}) 毫秒"""
+        uplink = self.calculate_propagation_delay(sender_name, sender_name) / 2
+        return uplink, {name: self.calculate_propagation_delay(sender_name, name) - uplink
+                        for name in targets}
+
+    def calculate_propagation_delay(self, station1, station2, t=None):
+        """
+        计算传播时延 (ms)
+        有轨道几何表且两站均已登记时，按 t 时刻（秒，默认取仿真时钟）的上下行斜距插值；
+        否则退回简化模型
+        """
+        geometry = self.geometry
+        if (geometry is not None and station1 in geometry.station_index
+                and station2 in geometry.station_index):
+            if t is None:
+                t = self.sim.now / 1000 if self.sim is not None else 0.0
+            return (geometry.delay_ms(station1, self.geometry_index, t)
+                    + geometry.delay_ms(station2, self.geometry_index, t))
+
         # 假设卫星位于两站中间位置
         distance = 2 * self.orbit_height  # 近似往返距离（km）
         light_speed = 299792  # km/s
         return (distance / light_speed) * 1000  # 转换为毫秒
     
-    def receive_from_ground(self, sender_name, target_name, message):
-        """接收地面站数据并转发"""
-        start_time = time.time()
-        
+    def receive_from_ground(self, sender_name, target_name, message, on_delivered=None):
+        """
+        接收地面站数据并转发
+        :param target_name: 地面站名、组名或名称列表；多个目标时同一份载荷只上行、处理一次，
+                            再以只读共享的方式扇出到各目标
+        :param on_delivered: 仿真模式下每到达一个目标站时的回调 on_delivered(总时间ms, 目标站名)
+        :return: 总传输时间 (ms)；仿真模式下返回None，结果经回调给出
+        """
         # 验证目标是否存在
-        if target_name not in self.ground_stations:
-            raise ValueError(f"目标地面站 {target_name} 未注册！")
+        targets = self.resolve_targets(target_name)
+        message, nbytes = shared_payload(message)
+
+        if self.sim is not None:
+            # 上行传播 → 排队与星上处理 → 下行传播，均作为事件调度
+            uplink, downlinks = self._hop_delays(sender_name, targets)
+            self.sim.schedule(uplink, self._on_uplink, sender_name, downlinks, message, nbytes,
+                              self.sim.now, on_delivered)
+            return None
+
+        start_time = time.time()
         
         print(f"\n[卫星] 收到来自 {sender_name} 的上行数据")
         print("    ↳ 开始星上处理...")
@@ -54,19 +175,81 @@ class Satellite:
         # 处理时延
         time.sleep(self.processing_delay / 1000)
         
-        # 计算传播时延
-        propagation_delay = self.calculate_propagation_delay(sender_name, target_name)
-        
         # 第二跳：卫星 → 目标地面站
-        self.ground_stations[target_name].receive_data(sender_name, message)
+        for name in targets:
+            self.ground_stations[name].receive_data(sender_name, message)
+            account_delivery(self.deliveries, name, nbytes)
         
         # 计算总传输时间
         total_time = (time.time() - start_time) * 1000  # 转换为毫秒
         return total_time
 
+    def _on_uplink(self, sender_name, downlinks, message, nbytes, start, on_delivered):
+        """仿真事件：上行数据到达卫星，进入星上处理队列（单处理器，先到先服务）"""
+        if self.transponder is not None:
+            # 由转发器排队调度（组播只占用一次），发送完成后再经下行传播到达各目标
+            accepted = self.transponder.submit(
+                sender_name, message,
+                on_done=lambda packet: self._fan_out(sender_name, downlinks, message, nbytes, start, on_delivered))
+            if not accepted:
+                self.stats['dropped'] += 1
+            return
+
+        begin = max(self.sim.now, self.busy_until)
+        queue_delay = begin - self.sim.now
+        self.busy_until = begin + self.processing_delay
+        self.stats['queue_delay_ms'] += queue_delay
+        self.stats['max_queue_delay_ms'] = max(self.stats['max_queue_delay_ms'], queue_delay)
+        self.sim.schedule_at(self.busy_until, self._fan_out, sender_name, downlinks, message, nbytes,
+                             start, on_delivered)
+
+    def _fan_out(self, sender_name, downlinks, message, nbytes, start, on_delivered):
+        """仿真事件：处理完毕，同一份载荷按各目标的下行时延分别调度"""
+        for name, delay in downlinks.items():
+            self.sim.schedule(delay, self._on_downlink, sender_name, name, message, nbytes, start, on_delivered)
+
+    def _on_downlink(self, sender_name, target_name, message, nbytes, start, on_delivered):
+        """仿真事件：下行数据到达目标地面站"""
+        self.stats['forwarded'] += 1
+        account_delivery(self.deliveries, target_name, nbytes)
+        self.ground_stations[target_name].receive_data(sender_name, message)
+        if on_delivered is not None:
+            on_delivered(self.sim.now - start, target_name)
+
+
+def simulate(num_messages=10000, interval_ms=10.0, orbit_height_km=35786, seed=0):
+    """
+    离散事件仿真：两个地面站经一颗卫星互发 num_messages 条消息
+    :param interval_ms: 平均发送间隔（指数分布）
+    :return: (卫星统计, 每条消息的总传输时间列表ms, 仿真结束时刻ms)
+    """
+    import des
+
+    sim = des.Simulator(seed=seed)
+    sat = Satellite(orbit_height_km, sim=sim)
+    stations = [GroundStation("北京地面站", sat, decode=False), GroundStation("酒泉地面站", sat, decode=False)]
+    for station in stations:
+        sat.register_station(station)
+
+    t = 0.0
+    for i in range(num_messages):
+        t += sim.rng.expovariate(1 / interval_ms)
+        sender = stations[i % 2]
+        sim.schedule_at(t, sender.send_data, stations[(i + 1) % 2].name, i)
+
+    end = sim.run()
+    delays = [total for station in stations for _, total in station.sent]
+    return sat.stats, delays, end
+
 
 # 模拟演示
 if __name__ == "__main__":
+    # 离散事件仿真（虚拟时钟，远快于实时）
+    wall_start = time.time()
+    stats, delays, end = simulate()
+    print(f"仿真 {len(delays)} 条消息，虚拟时长 {end:.1f} ms，实际耗时 {(time.time() - wall_start) * 1000:.1f} ms")
+    print(f"平均传输时间 {sum(delays) / len(delays):.2f} ms，卫星统计: {stats}")
+
     # 创建卫星（地球静止轨道）
     sat = Satellite()
     
@@ -79,4 +262,8 @@ if __name__ == "__main__":
     data = data_proccess.send_data_proccess()
 
     # # 北京站发送测试消息
-    gs_beijing.send_data("酒泉地面站", data)
\ No newline at end of file
+    gs_beijing.send_data("酒泉地面站", data)
+
+    # 组播：同一份已编码调制的载荷分发给组内所有地面站
+    sat.create_group("全部地面站", list(sat.ground_stations))
+    gs_beijing.send_data("全部地面站", data)
\ No newline at end of file
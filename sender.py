@@ -1,5 +1,6 @@
 import socket
 import data_proccess
+import wire
 
 relay_host = '127.0.0.1'
 relay_port = 8888
@@ -7,21 +8,25 @@ relay_port = 8888
 receiver_host = '127.0.0.1'
 receiver_port = 8889
 
-sender_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-sender_socket.connect((relay_host, relay_port))
 
-data = data_proccess.send_data_proccess()
+def send(file_path=data_proccess.AUDIO_FILE, relay_addr=(relay_host, relay_port),
+         receiver_addr=(receiver_host, receiver_port)):
+    """对音频文件做完整发送处理，经中继发往接收端"""
+    data = data_proccess.send_data_proccess(file_path)
 
-message = f"receiver_host:{receiver_host},receiver_port:{receiver_port},data:{data}"
+    sender_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sender_socket.connect(relay_addr)
+    try:
+        # 调制信号按 float32 原始字节发送（消息头携带路由、类型与形状）
+        samples = wire.as_wire_array(data)
+        wire.send_array(sender_socket, receiver_addr[0], receiver_addr[1], samples)
+        print(f"Sent: {samples.shape} {samples.dtype} ({samples.nbytes} bytes)")
 
-try:
-    modulated_message = message.encode()
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        sender_socket.close()
 
-    sender_socket.sendall(modulated_message)
-    print(f"Sent: {message}")
 
-except Exception as e:
-    print(f"Error: {e}")
-finally:
-    sender_socket.close()
-    
\ No newline at end of file
+if __name__ == "__main__":
+    send()
@@ -0,0 +1,344 @@
+"""
+信源编码
+位于 AD 与信道编码之间：把 AD 输出的8位量化帧压缩成更短的比特流，再按信道编码帧长重新分帧；
+接收端在信道解码之后、DA 之前做逆变换，还原为8位量化帧
+    pcm    原样 8 位
+    mulaw  μ律压扩，按 bits 位非均匀量化
+    alaw   A律压扩，按 bits 位非均匀量化
+    adpcm  IMA ADPCM，每采样 4 位；按块独立编码，块内递推、块间并行（向量化）
+entropy=True 时再对码字做无损 Rice 编码（码字差分 → zigzag → Rice），不比原码字短则自动不用
+"""
+import struct
+import numpy as np
+
+MODES = {'pcm': 0, 'mulaw': 1, 'alaw': 2, 'adpcm': 3}
+MODE_NAMES = {v: k for k, v in MODES.items()}
+
+# 流头：模式, 码字位数, Rice参数(255表示未做熵编码), ADPCM块长, 采样数
+HEADER = struct.Struct('>BBBHI')
+NO_ENTROPY = 255
+
+# IMA ADPCM 步长表与索引调整表
+IMA_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487,
+    12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767], dtype=np.int64)
+IMA_INDEX = np.array([-1, -1, -1, -1, 2, 4, 6, 8], dtype=np.int64)
+
+
+def to_bits(values, width):
+    """无符号整数数组 → 每个值 width 位的比特数组（高位在前）"""
+    values = np.asarray(values, dtype=np.int64)
+    shifts = np.arange(width - 1, -1, -1)
+    return ((values[:, None] >> shifts) & 1).astype(np.uint8).ravel()
+
+
+def from_bits(bits, width):
+    """to_bits 的逆变换"""
+    bits = np.asarray(bits, dtype=np.int64).reshape(-1, width)
+    return bits @ (1 << np.arange(width - 1, -1, -1))
+
+
+def zigzag(values):
+    """有符号 → 无符号：0, -1, 1, -2, ... → 0, 1, 2, 3, ..."""
+    values = np.asarray(values, dtype=np.int64)
+    return np.where(values >= 0, 2 * values, -2 * values - 1)
+
+
+def unzigzag(values):
+    values = np.asarray(values, dtype=np.int64)
+    return np.where(values & 1, -((values + 1) >> 1), values >> 1)
+
+
+def rice_parameter(values):
+    """按均值选择 Rice 参数 k"""
+    mean = float(np.mean(values)) if len(values) else 0.0
+    return max(0, int(np.ceil(np.log2(mean + 1))) - 1)
+
+
+def rice_encode(values, k):
+    """
+    Rice 编码（向量化）
+    先连续存放所有商的一元码（q 个1后跟一个0），再连续存放所有 k 位余数，
+    解码时一元部分由前 n 个0的位置直接求出，无需逐个解析
+    """
+    values = np.asarray(values, dtype=np.int64)
+    q = values >> k
+    unary = np.ones(int(q.sum()) + len(values), dtype=np.uint8)
+    unary[np.cumsum(q + 1) - 1] = 0
+    if k == 0:
+        return unary
+    return np.concatenate([unary, to_bits(values & ((1 << k) - 1), k)])
+
+
+def rice_decode(bits, count, k):
+    """:return: (值数组, 消耗的比特数)"""
+    bits = np.asarray(bits, dtype=np.uint8)
+    zeros = np.flatnonzero(bits == 0)
+    if len(zeros) < count:
+        raise ValueError("Rice 码流不完整")
+    ends = zeros[:count]
+    q = np.diff(ends, prepend=-1) - 1
+    used = int(ends[-1]) + 1 if count else 0
+    if k == 0:
+        return q, used
+    if len(bits) < used + count * k:
+        raise ValueError("Rice 码流不完整")
+    r = from_bits(bits[used:used + count * k], k)
+    return (q << k) | r, used + count * k
+
+
+def mulaw_compress(x, mu=255.0):
+    x = np.clip(x, -1.0, 1.0)
+    return np.sign(x) * np.log1p(mu * np.abs(x)) / np.log1p(mu)
+
+
+def mulaw_expand(y, mu=255.0):
+    return np.sign(y) * np.expm1(np.abs(y) * np.log1p(mu)) / mu
+
+
+def alaw_compress(x, A=87.6):
+    x = np.clip(x, -1.0, 1.0)
+    ax = np.abs(x)
+    norm = 1 + np.log(A)
+    small = A * ax / norm
+    large = (1 + np.log(np.maximum(A * ax, 1.0))) / norm
+    return np.sign(x) * np.where(ax < 1 / A, small, large)
+
+
+def alaw_expand(y, A=87.6):
+    ay = np.abs(y)
+    norm = 1 + np.log(A)
+    small = ay * norm / A
+    large = np.exp(ay * norm - 1) / A
+    return np.sign(y) * np.where(ay < 1 / norm, small, large)
+
+
+def adpcm_encode(samples, block_size=128):
+    """
+    IMA ADPCM 编码（16位线性 → 4位码字）
+    各块以首采样为预测初值、以块内平均差分估计初始步长索引，彼此独立，
+    因此块内按采样递推时每一步都在所有块上同时计算
+    :return: (块头 (B, 2) [预测初值, 步长索引], 码字 (B, block_size-1))
+    """
+    samples = np.asarray(samples, dtype=np.int64).ravel()
+    if not len(samples):
+        return np.zeros((0, 2), dtype=np.int64), np.zeros((0, block_size - 1), dtype=np.int64)
+    pad = -len(samples) % block_size
+    if pad:
+        samples = np.concatenate([samples, np.full(pad, samples[-1])])
+    blocks = samples.reshape(-1, block_size)
+
+    predictor = blocks[:, 0].copy()
+    mean_diff = np.abs(np.diff(blocks, axis=1)).mean(axis=1)
+    index = np.clip(np.searchsorted(IMA_STEPS, mean_diff) - 1, 0, 88)
+    header = np.stack([predictor, index], axis=1)
+
+    codes = np.zeros((len(blocks), block_size - 1), dtype=np.int64)
+    for i in range(1, block_size):
+        step = IMA_STEPS[index]
+        diff = blocks[:, i] - predictor
+        sign = diff < 0
+        diff = np.abs(diff)
+        code = np.zeros(len(blocks), dtype=np.int64)
+        delta = step >> 3
+        for bit, shift in ((4, 0), (2, 1), (1, 2)):
+            s = step >> shift
+            hit = diff >= s
+            code |= np.where(hit, bit, 0)
+            diff = np.where(hit, diff - s, diff)
+            delta += np.where(hit, s, 0)
+        predictor = np.clip(predictor + np.where(sign, -delta, delta), -32768, 32767)
+        index = np.clip(index + IMA_INDEX[code], 0, 88)
+        codes[:, i - 1] = code | (sign.astype(np.int64) << 3)
+    return header, codes
+
+
+def adpcm_decode(header, codes):
+    """:return: 16位线性采样 (B * block_size,)"""
+    predictor = header[:, 0].astype(np.int64)
+    index = header[:, 1].astype(np.int64)
+    out = np.zeros((len(header), codes.shape[1] + 1), dtype=np.int64)
+    out[:, 0] = predictor
+    for i in range(codes.shape[1]):
+        code = codes[:, i]
+        step = IMA_STEPS[index]
+        delta = step >> 3
+        for bit, shift in ((4, 0), (2, 1), (1, 2)):
+            delta += np.where(code & bit, step >> shift, 0)
+        predictor = np.clip(predictor + np.where(code & 8, -delta, delta), -32768, 32767)
+        index = np.clip(index + IMA_INDEX[code & 7], 0, 88)
+        out[:, i + 1] = predictor
+    return out.ravel()
+
+
+class SourceCoder:
+    """
+    信源编解码器
+    encode 接收 AD 输出的二进制帧（每8位一个量化电平），返回按 frame_len 重新分帧的压缩比特帧；
+    decode 接收信道解码后的比特帧，返回与 AD 输出格式相同的二进制帧
+    注意：压缩后码流跨帧，残留误码会影响后续采样（Rice 编码时甚至整段失步），应配合足够强的信道编码
+    """
+    def __init__(self, mode='adpcm', bits=None, entropy=False, block_size=128, frame_len=1024,
+                 mu=255.0, A=87.6):
+        """
+        :param mode: 'pcm' / 'mulaw' / 'alaw' / 'adpcm'
+        :param bits: 压扩码字位数（mulaw/alaw，默认6位）；pcm 固定8位，adpcm 固定4位
+        :param entropy: 是否再做无损 Rice 编码
+        :param block_size: ADPCM 块长（采样数）
+        :param frame_len: 输出帧长，须与信道编码的帧长一致
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知信源编码模式: {mode}")
+        if mode == 'pcm':
+            bits = 8
+        elif mode == 'adpcm':
+            bits = 4
+        elif bits is None:
+            bits = 6
+        if not 1 <= bits <= 8:
+            raise ValueError("码字位数须在1~8之间")
+        self.mode = mode
+        self.bits = bits
+        self.entropy = entropy
+        self.block_size = block_size
+        self.frame_len = frame_len
+        self.mu = mu
+        self.A = A
+        self.stats = {'source_bits': 0, 'coded_bits': 0}
+
+    # 8位电平与各模式码字之间的转换
+    def _levels_to_codes(self, levels):
+        x = levels.astype(np.float64) / 127.5 - 1
+        if self.mode == 'pcm':
+            return levels.astype(np.int64)
+        if self.mode == 'adpcm':
+            return np.round(x * 32767).astype(np.int64)
+        y = mulaw_compress(x, self.mu) if self.mode == 'mulaw' else alaw_compress(x, self.A)
+        top = (1 << self.bits) - 1
+        return np.round((y + 1) / 2 * top).astype(np.int64)
+
+    def _codes_to_levels(self, codes):
+        if self.mode == 'pcm':
+            return codes.astype(np.uint8)
+        if self.mode == 'adpcm':
+            x = codes / 32767
+        else:
+            y = codes / ((1 << self.bits) - 1) * 2 - 1
+            x = mulaw_expand(y, self.mu) if self.mode == 'mulaw' else alaw_expand(y, self.A)
+        return np.clip(np.round((x + 1) * 127.5), 0, 255).astype(np.uint8)
+
+    def _pack_codes(self, codes, width):
+        """码字 → 比特；熵编码时按差分+zigzag做 Rice，不更短则退回定长"""
+        raw = to_bits(codes, width)
+        if not self.entropy:
+            return NO_ENTROPY, raw
+        # ADPCM 码字本身就是差分，只把符号-幅度映射为无符号；其余模式先做相邻差分
+        if self.mode == 'adpcm':
+            values = ((codes & 7) << 1) | (codes >> 3)
+        else:
+            values = zigzag(np.diff(codes, prepend=0))
+        k = rice_parameter(values)
+        coded = rice_encode(values, k)
+        return (k, coded) if len(coded) < len(raw) else (NO_ENTROPY, raw)
+
+    def _unpack_codes(self, bits, count, width, k):
+        if k == NO_ENTROPY:
+            if len(bits) < count * width:
+                raise ValueError("信源码流不完整")
+            return from_bits(bits[:count * width], width), count * width
+        values, used = rice_decode(bits, count, k)
+        if self.mode == 'adpcm':
+            return ((values & 1) << 3) | (values >> 1), used
+        return np.cumsum(unzigzag(values)), used
+
+    def compress(self, levels) -> np.ndarray:
+        """8位量化电平 → 压缩比特流（含流头）"""
+        levels = np.asarray(levels, dtype=np.uint8).ravel()
+        codes = self._levels_to_codes(levels)
+
+        if self.mode == 'adpcm':
+            block_header, codes = adpcm_encode(codes, self.block_size)
+            k, body = self._pack_codes(codes.ravel(), 4)
+            body = np.concatenate([to_bits(block_header[:, 0] & 0xFFFF, 16),
+                                   to_bits(block_header[:, 1], 8), body])
+        else:
+            k, body = self._pack_codes(codes, self.bits)
+
+        head = HEADER.pack(MODES[self.mode], self.bits, k, self.block_size, len(levels))
+        stream = np.concatenate([np.unpackbits(np.frombuffer(head, np.uint8)), body])
+        self.stats['source_bits'] += len(levels) * 8
+        self.stats['coded_bits'] += len(stream)
+        return stream
+
+    def decompress(self, bits) -> np.ndarray:
+        """压缩比特流 → 8位量化电平；多余的尾部填充比特被忽略"""
+        bits = np.asarray(bits, dtype=np.uint8).ravel()
+        head_bits = HEADER.size * 8
+        if len(bits) < head_bits:
+            raise ValueError("信源码流不完整")
+        mode, width, k, block_size, count = HEADER.unpack(np.packbits(bits[:head_bits]).tobytes())
+        if MODE_NAMES.get(mode) != self.mode or width != self.bits:
+            raise ValueError(f"信源码流模式不匹配: {MODE_NAMES.get(mode)}/{width}位")
+        body = bits[head_bits:]
+
+        if self.mode == 'adpcm':
+            num_blocks = -(-count // block_size)
+            header_bits = num_blocks * 24
+            if len(body) < header_bits:
+                raise ValueError("信源码流不完整")
+            predictor = from_bits(body[:num_blocks * 16], 16)
+            predictor = np.where(predictor >= 1 << 15, predictor - (1 << 16), predictor)
+            index = from_bits(body[num_blocks * 16:header_bits], 8)
+            codes, _ = self._unpack_codes(body[header_bits:], num_blocks * (block_size - 1), 4, k)
+            samples = adpcm_decode(np.stack([predictor, index], axis=1),
+                                   codes.reshape(num_blocks, block_size - 1))
+            return self._codes_to_levels(samples[:count])
+
+        codes, _ = self._unpack_codes(body, count, width, k)
+        return self._codes_to_levels(codes)
+
+    def encode(self, frames) -> list:
+        """
+        AD 输出的二进制帧 → 按 frame_len 分帧的压缩比特帧（末帧补零）
+        :param frames: 二维 0/1 数组，每8位为一个量化电平
+        """
+        levels = np.packbits(np.asarray(frames, dtype=np.uint8).ravel())
+        stream = self.compress(levels)
+        stream = np.concatenate([stream, np.zeros(-len(stream) % self.frame_len, dtype=np.uint8)])
+        return list(stream.reshape(-1, self.frame_len))
+
+    def decode(self, frames) -> np.ndarray:
+        """
+        信道解码后的比特帧 → 二进制帧（每8位一个量化电平），可直接交给 sound_DAtrans
+        """
+        bits = np.concatenate([np.asarray(f, dtype=np.uint8).ravel() for f in frames])
+        return np.unpackbits(self.decompress(bits))
+
+    @property
+    def ratio(self):
+        """累计压缩比（压缩后比特 / 原始比特）"""
+        return self.stats['coded_bits'] / self.stats['source_bits'] if self.stats['source_bits'] else 1.0
+
+
+# 使用示例
+if __name__ == "__main__":
+    # 合成语音样信号：两个正弦叠加少量噪声，8位量化后取10帧（与 AD 输出相同格式）
+    rng = np.random.default_rng(0)
+    t = np.arange(1280) / 8000
+    x = 0.5 * np.sin(2 * np.pi * 300 * t) + 0.2 * np.sin(2 * np.pi * 1100 * t) + 0.01 * rng.standard_normal(len(t))
+    levels = np.clip(np.round((x + 1) * 127.5), 0, 255).astype(np.uint8)
+    frames = np.unpackbits(levels).reshape(10, 1024)
+
+    for mode, options in [('pcm', {}), ('pcm', {'entropy': True}), ('mulaw', {}), ('alaw', {}),
+                          ('mulaw', {'bits': 4}), ('adpcm', {}), ('adpcm', {'entropy': True})]:
+        coder = SourceCoder(mode, **options)
+        coded = coder.encode(frames)
+        restored = np.packbits(coder.decode(coded)).astype(float)
+        noise = np.sum((restored - levels) ** 2)
+        snr = f"{10 * np.log10(np.sum((levels - 127.5) ** 2) / noise):6.1f} dB" if noise else "无损"
+        print(f"{mode:>6} {str(options):<18} 帧数 {len(frames)} → {len(coded):>2}  "
+              f"压缩比 {coder.ratio:.3f}  SNR {snr}")
@@ -1,96 +1,276 @@
-import moderate_test, coding_test, ADtest, protocol
+"""
+界面用的处理流程与波形图
+各阶段数据流过时即时压缩成固定像素预算的绘图摘要（分桶最小/最大值包络或 LTTB），
+完整数组用完即释放；调制/解调按比特块流式进行，不再同时持有整批调制信号。
+PipelineWorker 在后台线程运行流程，每完成一个阶段就把摘要放入队列，界面线程取出后绘制
+"""
+import queue
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import moderate_test, fec, ADtest, protocol, data_proccess
 
-def downsample(data, max_samples=100):
-    """下采样数据以避免内存问题"""
-    if isinstance(data, (list, np.ndarray)):
-        if len(data) > max_samples:
-            step = len(data) // max_samples
-            return data[::step]
-    return data
+PIXELS = 1000                # 每幅图的横向点数预算
+MODULATE_CHUNK_BITS = 256    # 调制/解调的流式块大小（比特）
 
-def plot_single_waveform(title, data):
-    """绘制单个波形图，并返回 plt.Figure 对象（不显示窗口）"""
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # 处理不同维度的数据
-    data = downsample(data)  # 下采样
-    
-    if isinstance(data, (list, np.ndarray)):
-        if len(np.array(data).shape) == 1:  # 一维数据
-            ax.plot(data, label=title)
-        elif len(np.array(data).shape) == 2:  # 二维数据
-            for j, row in enumerate(data[:1]): 
-                ax.plot(downsample(row), label=f'{title}[{j}]')
-    
-    ax.set_title(title)
-    ax.set_xlabel('Sample Index')
+
+class Envelope:
+    """
+    分桶最小/最大值包络，可分块增量更新
+    总长度已知时，把 [0, total) 均分为 buckets 个桶，每块数据只更新其覆盖的桶
+    """
+    def __init__(self, total, buckets=PIXELS):
+        self.total = max(int(total), 1)
+        self.buckets = min(buckets, self.total)
+        self.lo = np.full(self.buckets, np.inf)
+        self.hi = np.full(self.buckets, -np.inf)
+        self.count = 0
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64).ravel()
+        if not chunk.size:
+            return
+        positions = np.arange(self.count, self.count + chunk.size)
+        index = np.minimum(positions * self.buckets // self.total, self.buckets - 1)
+        starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        np.minimum.at(self.lo, index[starts], np.minimum.reduceat(chunk, starts))
+        np.maximum.at(self.hi, index[starts], np.maximum.reduceat(chunk, starts))
+        self.count += chunk.size
+
+    def summary(self):
+        """:return: (x, lo, hi)，只包含已有数据的桶"""
+        filled = np.isfinite(self.lo)
+        x = (np.arange(self.buckets) + 0.5) * self.total / self.buckets
+        return x[filled], self.lo[filled], self.hi[filled]
+
+
+def minmax_decimate(data, buckets=PIXELS):
+    """一次性对一维数据做最小/最大值抽取"""
+    envelope = Envelope(len(data), buckets)
+    envelope.update(data)
+    return envelope.summary()
+
+
+def lttb(x, y, threshold=PIXELS):
+    """
+    Largest-Triangle-Three-Buckets 抽取：保留视觉上最显著的点
+    :return: (x, y) 各 threshold 个点
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    # 每个桶的平均点，作为下一个桶选点时的第三个顶点
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    avg_x, avg_y = sums_x / sizes, sums_y / sizes
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = (avg_x[i + 1], avg_y[i + 1]) if i + 1 < len(avg_x) else (x[-1], y[-1])
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+
+class Summary:
+    """一幅图的绘图摘要；lo 与 hi 相同时画折线，否则画包络"""
+    def __init__(self, title, x, lo, hi=None, xlabel='Sample Index'):
+        self.title = title
+        self.x = x
+        self.lo = lo
+        self.hi = lo if hi is None else hi
+        self.xlabel = xlabel
+
+    @classmethod
+    def from_envelope(cls, title, envelope, **kwargs):
+        return cls(title, *envelope.summary(), **kwargs)
+
+    @classmethod
+    def from_series(cls, title, data, method='minmax', x=None, **kwargs):
+        data = np.asarray(data, dtype=np.float64).ravel()
+        if method == 'lttb':
+            x = np.arange(len(data)) if x is None else x
+            return cls(title, *lttb(x, data), **kwargs)
+        return cls(title, *minmax_decimate(data), **kwargs)
+
+
+def render(summary):
+    """
+    绘制摘要，返回 Figure 对象（不经 pyplot，不弹窗口，不被全局注册，释放引用即可回收）
+    须在界面线程调用
+    """
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    if summary.lo is summary.hi:
+        ax.plot(summary.x, summary.lo, label=summary.title)
+    else:
+        ax.fill_between(summary.x, summary.lo, summary.hi, step='mid', alpha=0.6, label=summary.title)
+    ax.set_title(summary.title)
+    ax.set_xlabel(summary.xlabel)
     ax.set_ylabel('Amplitude')
     ax.grid(True)
     ax.legend(loc='upper right', fontsize='small')
-    
-    plt.tight_layout()
-    return fig  # 返回 Figure 对象，不自动显示
+    fig.tight_layout()
+    return fig
+
+
+def plot_single_waveform(title, data):
+    """绘制单个波形图（按最小/最大值包络抽取），返回 Figure 对象"""
+    return render(Summary.from_series(title, data))
 
-def return_figures():
-    try:
-        # 存储所有 Figure 对象
-        figures = []
 
-        turbo = coding_test.TurboEncoderDecoder()
-        _modulate = moderate_test.AmplitudeModem()
-        _protocol = protocol.ProtocolHandler()
+def _rows_envelope(title, rows):
+    """对多帧数据按首尾相接的整条流做包络"""
+    envelope = Envelope(sum(len(row) for row in rows))
+    for row in rows:
+        envelope.update(row)
+    return Summary.from_envelope(title, envelope)
 
-        fig_ad, quantized_signal, frames = ADtest.SoundOperation.sound_ADtrans("/home/hyrozine/py_work/BAK.wav")
-        print(f"frames:{len(frames[0])}")
 
-        figures.append(fig_ad)
+def iter_summaries(file_path=data_proccess.AUDIO_FILE, codec='turbo', stop=None, conversion_figures=False):
+    """
+    运行完整处理流程，每完成一个阶段产出一个 Summary
+    前一阶段的数组在下一阶段用完后即释放；调制信号只以 MODULATE_CHUNK_BITS 比特的块存在
+    :param stop: threading.Event，置位后在阶段之间提前结束
+    :param conversion_figures: True 时 AD/DA 两个阶段改为产出 ADtest 绘制的三联图（pyplot Figure，
+                               只能在主线程使用，后台线程中须保持 False）
+    """
+    channel_codec = fec.create(codec)
+    _modulate = moderate_test.AmplitudeModem()
+    _protocol = protocol.ProtocolHandler()
 
-        print("数据处理流程开始...")
-        encode_bits = turbo.encode(frames)
-        print(f"ecode_bits_len:{len(encode_bits[0])}")
+    def stopped():
+        return stop is not None and stop.is_set()
 
-        send_p = _protocol.build_frames(encode_bits)
-        print(f"send_p_len:{len(send_p[0])}")
+    fig_ad, quantized_signal, frames = ADtest.SoundOperation.sound_ADtrans(file_path, plot=conversion_figures)
+    print(f"frames:{len(frames[0])}")
+    yield fig_ad if conversion_figures else Summary.from_series('AD Quantized Signal', quantized_signal, method='lttb')
+    del quantized_signal
+    if stopped():
+        return
 
-        _modulate_bits = _modulate.modulate(send_p)
-        print(f"modulate_bits_len:{len(_modulate_bits[0])}")
+    encode_bits = channel_codec.encode(frames)
+    print(f"ecode_bits_len:{len(encode_bits[0])}")
+    yield _rows_envelope('Encoded Bits', encode_bits)
+    if stopped():
+        return
 
-        demodulate_bits = _modulate.demodulate(_modulate_bits)
-        print(f"demodulate_bits_len:{len(demodulate_bits[0])}")
+    send_p = _protocol.build_frames(encode_bits)
+    del encode_bits
+    print(f"send_p_len:{len(send_p[0])}")
+    yield _rows_envelope('Protocol Frames', send_p)
+    if stopped():
+        return
 
-        recieve_p = _protocol.parse_frames(demodulate_bits)
-        print(f"recieve_p_len:{len(recieve_p[0])}")
+    # 调制与解调逐块进行：每块调制后立即摘要并解调，然后丢弃
+    total_bits = sum(len(row) for row in send_p)
+    modulated_env = Envelope(total_bits * _modulate.samples_per_bit)
+    demodulated_env = Envelope(total_bits)
+    demodulate_bits = []
+    for row in send_p:
+        row_bits = []
+        for start in range(0, len(row), MODULATE_CHUNK_BITS):
+            chunk = np.asarray(_modulate.modulate([row[start:start + MODULATE_CHUNK_BITS]])[0], dtype=np.float32)
+            modulated_env.update(chunk)
+            bits = _modulate.demodulate([chunk])[0]
+            demodulated_env.update(bits)
+            row_bits.extend(bits)
+        demodulate_bits.append(row_bits)
+        if stopped():
+            return
+    del send_p
+    print(f"demodulate_bits_len:{len(demodulate_bits[0])}")
+    yield Summary.from_envelope('Modulated Signal', modulated_env)
+    yield Summary.from_envelope('Demodulated Signal', demodulated_env)
 
-        decode_bits = turbo.decode(recieve_p)
-        print(f"decode_bits_len:{len(decode_bits[0])}")
+    recieve_p = _protocol.parse_frames(demodulate_bits)
+    del demodulate_bits
+    print(f"recieve_p_len:{len(recieve_p[0])}")
+    yield _rows_envelope('Received Protocol', recieve_p)
+    if stopped():
+        return
 
-        fig_da, filtered_signal, t_reconstructed = ADtest.SoundOperation.sound_DAtrans(decode_bits)
-        print(f"da_bits:{len(filtered_signal)}")
+    decode_bits = channel_codec.decode(recieve_p)
+    del recieve_p
+    print(f"decode_bits_len:{len(decode_bits[0])}")
+    yield _rows_envelope('Decoded Bits', decode_bits)
+    if stopped():
+        return
 
-        print("数据处理流程完成")
+    fig_da, filtered_signal, t_reconstructed = ADtest.SoundOperation.sound_DAtrans(decode_bits, plot=conversion_figures)
+    print(f"da_bits:{len(filtered_signal)}")
+    if conversion_figures:
+        yield fig_da
+        return
+    yield Summary.from_series('DA Filtered Signal', filtered_signal, method='lttb',
+                              x=t_reconstructed, xlabel='Time (s)')
 
-        # 准备要绘制的数据
-        data_to_plot = {
-            'Encoded Bits': encode_bits,
-            'Protocol Frames': send_p,
-            'Modulated Signal': _modulate_bits,
-            'Demodulated Signal': demodulate_bits,
-            'Received Protocol': recieve_p,
-            'Decoded Bits': decode_bits,
-        }
-        
-        print("开始绘制波形图...")
-        for title, data in data_to_plot.items():
-            fig = plot_single_waveform(title, data)  # 获取 Figure 对象
-            figures.append(fig)  # 存储 Figure
 
-        figures.append(fig_da)
-        
-    except MemoryError:
-        print("错误: 内存不足，请减少数据量")
+class PipelineWorker(threading.Thread):
+    """
+    后台运行处理流程，把每个阶段的摘要放入 self.queue：
+        ('stage', Summary) / ('error', 错误信息) / ('done', None)
+    界面线程用定时器调用 poll() 取出并绘制，不会被流程阻塞
+    """
+    def __init__(self, file_path=data_proccess.AUDIO_FILE, codec='turbo'):
+        super().__init__(daemon=True)
+        self.file_path = file_path
+        self.codec = codec
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.finished = False
+
+    def run(self):
+        try:
+            print("数据处理流程开始...")
+            for summary in iter_summaries(self.file_path, self.codec, self.stop_event):
+                self.queue.put(('stage', summary))
+            print("数据处理流程完成")
+        except Exception as e:
+            self.queue.put(('error', f"发生错误: {str(e)}"))
+        finally:
+            self.queue.put(('done', None))
+
+    def cancel(self):
+        self.stop_event.set()
+
+    def poll(self, on_figure, on_error=print):
+        """
+        非阻塞地取出已完成的阶段，绘制后交给 on_figure(Figure)
+        :return: 流程是否仍在进行
+        """
+        while True:
+            try:
+                kind, item = self.queue.get_nowait()
+            except queue.Empty:
+                return not self.finished
+            if kind == 'stage':
+                on_figure(render(item))
+            elif kind == 'error':
+                on_error(item)
+            else:
+                self.finished = True
+
+
+def return_figures(codec='turbo'):
+    """
+    同步运行流程并返回全部 Figure 对象（兼容旧接口；界面应优先使用 PipelineWorker）
+    与旧版相同，首尾两幅是 AD/DA 转换过程的三联图，中间为各阶段波形图
+    :param codec: fec 注册表中的编解码器名称
+    """
+    figures = []
+    try:
+        for item in iter_summaries(codec=codec, conversion_figures=True):
+            figures.append(render(item) if isinstance(item, Summary) else item)
     except Exception as e:
         print(f"发生错误: {str(e)}")
-    
-    return figures
\ No newline at end of file
+    return figures
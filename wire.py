@@ -0,0 +1,201 @@
+"""
+二进制线路协议（sender / relay / receiver 之间）
+消息格式：[固定头(20B) | 主机名(hB) | 形状(ndim*4B) | 数据(NB)]
+固定头：魔数'PSAT'(4B) | 版本(1B) | 数据类型(1B) | 维数(1B) | 主机名长度(1B)
+        | 端口(2B) | 保留(2B) | 数据长度(8B)
+数据为小端序、C连续的原始数组字节，发送端用 memoryview 直接发送，不做文本转换
+"""
+import asyncio
+import struct
+import numpy as np
+
+MAGIC = b'PSAT'
+VERSION = 1
+HEADER = struct.Struct('>4sBBBBHHQ')
+DIM = struct.Struct('>I')
+# 单条消息数据区上限 (字节)：收到超限的消息头时拒绝，避免按伪造的长度分配内存；
+# 默认参数下一次发送10帧 turbo 编码的调制信号约 550MB
+MAX_MESSAGE = 1 << 30
+
+# 数据类型编号 ↔ numpy dtype
+DTYPES = {
+    1: np.dtype('<f4'),
+    2: np.dtype('u1'),
+    3: np.dtype('<f8'),
+    4: np.dtype('<i2'),
+}
+DTYPE_CODES = {dtype: code for code, dtype in DTYPES.items()}
+
+
+def pack_header(receiver_host: str, receiver_port: int, arr: np.ndarray) -> bytes:
+    """生成消息头（固定头 + 主机名 + 形状）"""
+    code = DTYPE_CODES.get(arr.dtype)
+    if code is None:
+        raise ValueError(f"不支持的数据类型: {arr.dtype}")
+    host = receiver_host.encode()
+    if len(host) > 255:
+        raise ValueError("主机名过长")
+    return (HEADER.pack(MAGIC, VERSION, code, arr.ndim, len(host), receiver_port, 0, arr.nbytes)
+            + host + b''.join(DIM.pack(n) for n in arr.shape))
+
+
+def unpack_header(fixed: bytes, max_bytes=MAX_MESSAGE):
+    """
+    解析固定头
+    :param max_bytes: 数据长度上限，超过时抛出 ValueError
+    :return: (dtype, ndim, host_len, port, nbytes)
+    """
+    magic, version, code, ndim, host_len, port, _, nbytes = HEADER.unpack(fixed)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("消息头不匹配")
+    if code not in DTYPES:
+        raise ValueError(f"未知数据类型编号: {code}")
+    if nbytes > max_bytes:
+        raise ValueError(f"消息超过上限 {max_bytes} 字节（声明 {nbytes} 字节）")
+    return DTYPES[code], ndim, host_len, port, nbytes
+
+
+def unpack_meta(meta: bytes, dtype, ndim, host_len, nbytes):
+    """
+    解析主机名与形状，并检查形状与数据长度一致
+    :return: (receiver_host, shape)
+    """
+    host = bytes(meta[:host_len]).decode()
+    shape = tuple(DIM.unpack_from(meta, host_len + i * DIM.size)[0] for i in range(ndim))
+    expected = int(np.prod(shape, dtype=object)) * dtype.itemsize
+    if expected != nbytes:
+        raise ValueError(f"数据长度 {nbytes} 与形状 {shape} 不符（应为 {expected} 字节）")
+    return host, shape
+
+
+def as_wire_array(data, dtype=np.float32) -> np.ndarray:
+    """把列表/数组转换为可直接发送的小端、C连续数组（已满足时不复制）"""
+    arr = data if isinstance(data, np.ndarray) else np.asarray(data, dtype=dtype)
+    if arr.dtype not in DTYPE_CODES:
+        arr = arr.astype(np.dtype(dtype).newbyteorder('<'))
+    return np.ascontiguousarray(arr)
+
+
+def send_array(sock, receiver_host: str, receiver_port: int, data, dtype=np.float32):
+    """发送一条消息：消息头 + 原始数组字节（零拷贝）"""
+    arr = as_wire_array(data, dtype)
+    sock.sendall(pack_header(receiver_host, receiver_port, arr))
+    sock.sendall(memoryview(arr).cast('B'))
+
+
+def _recv_exact(sock, view: memoryview) -> bool:
+    """用 recv_into 填满 view；对端在消息开始前关闭返回False"""
+    received = 0
+    while received < len(view):
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return False
+            raise ConnectionError("连接在消息中途关闭")
+        received += n
+    return True
+
+
+class MessageReader:
+    """
+    阻塞套接字上的消息接收器
+    数据区使用预分配缓冲区（不足时扩容），recv_into 直接写入，不做拼接
+    """
+    def __init__(self, sock, initial_size=1 << 20):
+        self.sock = sock
+        self.buffer = bytearray(initial_size)
+        self.fixed = bytearray(HEADER.size)
+
+    def recv(self, copy=True):
+        """
+        接收一条消息
+        :param copy: False时返回的数组直接引用内部缓冲区，下次调用前有效
+        :return: (receiver_host, receiver_port, ndarray)，连接关闭返回None
+        """
+        if not _recv_exact(self.sock, memoryview(self.fixed)):
+            return None
+        dtype, ndim, host_len, port, nbytes = unpack_header(bytes(self.fixed))
+
+        meta = bytearray(host_len + ndim * DIM.size)
+        if meta and not _recv_exact(self.sock, memoryview(meta)):
+            raise ConnectionError("连接在消息中途关闭")
+        host, shape = unpack_meta(meta, dtype, ndim, host_len, nbytes)
+
+        if nbytes > len(self.buffer):
+            self.buffer = bytearray(max(nbytes, 2 * len(self.buffer)))
+        view = memoryview(self.buffer)[:nbytes]
+        if nbytes and not _recv_exact(self.sock, view):
+            raise ConnectionError("连接在消息中途关闭")
+
+        arr = np.frombuffer(view, dtype=dtype).reshape(shape)
+        return host, port, (arr.copy() if copy else arr)
+
+
+async def read_frame(reader):
+    """
+    asyncio 版本：读取一条完整消息但不解码数据（供中继原样转发）
+    :return: (receiver_host, receiver_port, (固定头, 主机名+形状, 数据))，连接关闭返回None
+             三段字节可直接交给 writer.writelines 转发，无需拼接
+    """
+    try:
+        fixed = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("连接在消息中途关闭")
+        return None
+    dtype, ndim, host_len, port, nbytes = unpack_header(fixed)
+    meta = await reader.readexactly(host_len + ndim * DIM.size)
+    host, _ = unpack_meta(meta, dtype, ndim, host_len, nbytes)
+    payload = await reader.readexactly(nbytes)
+    return host, port, (fixed, meta, payload)
+
+
+async def read_header(reader):
+    """
+    asyncio 版本：只读取消息头，数据部分留给调用方分块读取
+    :return: (receiver_host, receiver_port, dtype, shape, nbytes)，连接关闭返回None
+    """
+    try:
+        fixed = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("连接在消息中途关闭")
+        return None
+    dtype, ndim, host_len, port, nbytes = unpack_header(fixed)
+    meta = await reader.readexactly(host_len + ndim * DIM.size)
+    host, shape = unpack_meta(meta, dtype, ndim, host_len, nbytes)
+    return host, port, dtype, shape, nbytes
+
+
+async def iter_payload(reader, dtype, nbytes, chunk_bytes=1 << 16):
+    """
+    asyncio 版本：按到达顺序分块产出数据部分（一维数组，每块为元素大小的整数倍）
+    用于边收边处理，不必等整条消息到齐
+    """
+    chunk_bytes -= chunk_bytes % dtype.itemsize
+    remaining = nbytes
+    while remaining:
+        size = min(chunk_bytes, remaining)
+        yield np.frombuffer(await reader.readexactly(size), dtype=dtype)
+        remaining -= size
+
+
+async def read_array(reader):
+    """
+    asyncio 版本：读取并解码一条消息
+    :return: (receiver_host, receiver_port, ndarray)，连接关闭返回None
+    """
+    frame = await read_frame(reader)
+    if frame is None:
+        return None
+    host, port, (fixed, meta, payload) = frame
+    dtype, ndim, host_len, _, nbytes = unpack_header(fixed)
+    _, shape = unpack_meta(meta, dtype, ndim, host_len, nbytes)
+    return host, port, np.frombuffer(payload, dtype=dtype).reshape(shape)
+
+
+def write_array(writer, receiver_host: str, receiver_port: int, data, dtype=np.float32):
+    """asyncio 版本：写入一条消息（调用方负责 await writer.drain()）"""
+    arr = as_wire_array(data, dtype)
+    writer.write(pack_header(receiver_host, receiver_port, arr))
+    writer.write(memoryview(arr).cast('B'))